@@ -0,0 +1,98 @@
+import time
+
+from metrics import METRICS
+
+FRAME_MS = 16 # ~60 fps
+
+def linear(p):
+    return p
+
+def ease_in(p):
+    return p * p
+
+def lerp(a, b, p):
+    return a + (b - a) * p
+
+# Blends two "#rrggbb" colours.
+def blend(color1, color2, p):
+    c1 = [int(color1[i:i + 2], 16) for i in (1, 3, 5)]
+    c2 = [int(color2[i:i + 2], 16) for i in (1, 3, 5)]
+    return "#" + "".join(f"{round(lerp(a, b, p)):02x}" for a, b in zip(c1, c2))
+
+class Tween:
+    def __init__(self, duration, update, easing, on_done):
+        self.duration = duration
+        self.update = update
+        self.easing = easing
+        self.on_done = on_done
+        self.start = None
+
+class Animator:
+    # Advances every active tween (swaps, falls, fades) from a single root.after frame clock.
+    # Progress comes from elapsed wall time rather than from counting ticks, so when the loop
+    # falls behind the late frames are merged into the next tick instead of piling up, and
+    # animations finish on time however many frames were dropped.
+    def __init__(self, root, frame_ms=FRAME_MS):
+        self.root = root
+        self.frame_ms = frame_ms
+        self.tweens = []
+        self.job = None
+        self.next_due = None
+        self.last_tick = None
+
+    def add(self, duration, update, easing=linear, on_done=None):
+        # Starts a tween: update(progress) is called once per frame with progress running 0 -> 1.
+        self.tweens.append(Tween(duration, update, easing, on_done))
+        if self.job is None:
+            self.next_due = time.perf_counter()
+            self.last_tick = None
+            self.job = self.root.after_idle(self._tick)
+
+    def play(self, duration, updates, easing=linear, on_done=None):
+        # Runs several updates on one shared timeline and calls on_done once, after the last.
+        updates = list(updates)
+        if not updates:
+            if on_done:
+                self.root.after_idle(on_done)
+            return
+        self.add(duration, lambda p: [update(p) for update in updates], easing, on_done)
+
+    def cancel_all(self):
+        # Drops every tween without calling their on_done callbacks.
+        self.tweens = []
+        if self.job is not None:
+            self.root.after_cancel(self.job)
+            self.job = None
+
+    def _tick(self):
+        now = time.perf_counter()
+        frame = self.frame_ms / 1000.0
+        if self.last_tick is not None and METRICS.enabled:
+            METRICS.frame(now - self.last_tick, max(0, round((now - self.last_tick) / frame) - 1))
+        if now - self.next_due >= frame:
+            self.next_due = now # Fell behind: restart the clock rather than firing catch-up ticks
+        self.last_tick = now
+
+        finished = []
+        running = []
+        for tween in self.tweens:
+            if tween.start is None:
+                tween.start = now
+            p = min(1.0, (now - tween.start) / tween.duration) if tween.duration > 0 else 1.0
+            tween.update(tween.easing(p))
+            (finished if p >= 1.0 else running).append(tween)
+        self.tweens = running
+
+        # Callbacks may start new tweens; those join the next frame.
+        for tween in finished:
+            if tween.on_done:
+                tween.on_done()
+
+        if self.tweens:
+            self.next_due += frame
+            delay = max(1, int((self.next_due - time.perf_counter()) * 1000))
+            self.job = self.root.after(delay, self._tick)
+        else:
+            self.job = None
+
+METRICS.instrument(Animator, _tick="frame")
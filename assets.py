@@ -0,0 +1,101 @@
+import functools
+import os
+import tkinter as tk
+
+# === Setup path for assets ===
+try:
+    ASSET_PATH = os.path.dirname(os.path.abspath(__file__))
+except NameError:
+    ASSET_PATH = os.getcwd()
+
+# Pre-resized copies of the source images live here. Each copy carries its source's mtime,
+# so editing or replacing a source image invalidates every size cached from it.
+CACHE_DIR = os.path.join(ASSET_PATH, ".asset_cache")
+
+CANDY_SIZE = (58, 58)
+BACKGROUND_SIZE = (800, 700)
+FALLBACK_COLORS = ["red", "blue", "green", "yellow", "purple", "orange", "cyan", "pink"]
+
+def _source_mtime(name):
+    try:
+        return os.stat(os.path.join(ASSET_PATH, name)).st_mtime_ns
+    except OSError:
+        return None
+
+def _cache_path(name, size):
+    stem, _ = os.path.splitext(name)
+    return os.path.join(CACHE_DIR, f"{stem}_{size[0]}x{size[1]}.png")
+
+def _is_fresh(cached, mtime_ns):
+    try:
+        return os.stat(cached).st_mtime_ns == mtime_ns
+    except OSError:
+        return False
+
+# Resizes asset `name` to `size` with PIL and stores the result in the disk cache. Returns the
+# PIL image if the cache could not be written. PIL is only imported here, so a warm cache
+# never loads it.
+def _build(name, size, mtime_ns):
+    from PIL import Image
+    img = Image.open(os.path.join(ASSET_PATH, name)).resize(size, Image.Resampling.LANCZOS)
+    cached = _cache_path(name, size)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        img.save(cached)
+        os.utime(cached, ns=(mtime_ns, mtime_ns))
+        return None
+    except OSError as e:
+        print(f"Could not cache {name} at {size[0]}x{size[1]}: {e}")
+        return img
+
+# Decoded PhotoImages, keyed by file, size and source mtime so a changed file misses the cache.
+# Cached PNGs are decoded by Tk itself.
+@functools.lru_cache(maxsize=32)
+def _photo(name, size, mtime_ns):
+    if mtime_ns is None:
+        raise FileNotFoundError(os.path.join(ASSET_PATH, name))
+    cached = _cache_path(name, size)
+    if not _is_fresh(cached, mtime_ns):
+        img = _build(name, size, mtime_ns)
+        if img is not None:
+            from PIL import ImageTk
+            return ImageTk.PhotoImage(img)
+    return tk.PhotoImage(file=cached)
+
+@functools.lru_cache(maxsize=32)
+def _fallback(index, size):
+    w, h = size[0] + 2, size[1] + 2
+    img = tk.PhotoImage(width=w, height=h)
+    img.put(FALLBACK_COLORS[index % len(FALLBACK_COLORS)], to=(0, 0, w, h))
+    return img
+
+# Loads, resizes, and returns a candy image or a colored block as a fallback.
+def load_image(index, size=CANDY_SIZE):
+    name = f"candy{index}.png"
+    try:
+        return _photo(name, size, _source_mtime(name))
+    except Exception:
+        return _fallback(index, size)
+
+# Loads the window background at the given size; raises if background.png cannot be read.
+def load_background(size=BACKGROUND_SIZE):
+    return _photo("background.png", tuple(size), _source_mtime("background.png"))
+
+# Fills the disk cache for every candy and the background at their default sizes, so a
+# fresh install starts without touching PIL. Returns the names that could not be built.
+def prebuild(num_candies, sizes=(CANDY_SIZE,), background_sizes=(BACKGROUND_SIZE,)):
+    jobs = [(f"candy{i}.png", size) for i in range(num_candies) for size in sizes]
+    jobs += [("background.png", size) for size in background_sizes]
+    missing = []
+    for name, size in jobs:
+        mtime_ns = _source_mtime(name)
+        if mtime_ns is None:
+            missing.append(name)
+        elif not _is_fresh(_cache_path(name, size), mtime_ns):
+            _build(name, size, mtime_ns)
+    return missing
+
+if __name__ == "__main__":
+    from board import LEVELS
+    missing = prebuild(max(config["num_types"] for config in LEVELS))
+    print(f"Asset cache ready in {CACHE_DIR}" + (f" (missing: {', '.join(missing)})" if missing else ""))
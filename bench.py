@@ -0,0 +1,190 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+from board import ENGINES, LEVELS, board_class, find_hint
+
+LEVEL_SIZES = sorted({config["board_size"][0] for config in LEVELS})
+STRESS_SIZES = [50, 100, 200, 400]
+
+class BenchState:
+    # One engine at one board size, seeded so every run replays the same boards and moves.
+    def __init__(self, cls, size, num_types, seed):
+        self.cls = cls
+        self.size = size
+        self.num_types = num_types
+        self.rng = random.Random(seed)
+        self.new_board()
+
+    def new_board(self):
+        self.board = self.cls(self.size, self.size, self.num_types, seed=self.rng.getrandbits(64))
+
+    def play_move(self):
+        # Makes one valid swap (untimed), starting over on a fresh board when deadlocked.
+        while True:
+            move = self.board.first_move()
+            if move:
+                (r1, c1), (r2, c2) = move
+                self.board.swap(r1, c1, r2, c2)
+                return
+            self.new_board()
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+# Each operation returns the seconds spent in the call under test; anything else it does
+# to get the board into the right state is left out of the measurement.
+def op_init(st):
+    seed = st.rng.getrandbits(64)
+    return _timed(lambda: st.cls(st.size, st.size, st.num_types, seed=seed))
+
+def op_check_matches_full(st):
+    return _timed(lambda: st.board.check_matches(full=True))
+
+def op_check_matches(st):
+    st.play_move()
+    elapsed = _timed(st.board.check_matches)
+    st.board.remove_matches()
+    return elapsed
+
+def op_check_local_matches(st):
+    r, c = st.rng.randrange(st.size), st.rng.randrange(st.size)
+    return _timed(lambda: st.board._check_local_matches(r, c))
+
+def op_swap(st):
+    move = st.board.first_move()
+    if move is None:
+        st.new_board()
+        return op_swap(st)
+    (r1, c1), (r2, c2) = move
+    elapsed = _timed(lambda: st.board.swap(r1, c1, r2, c2))
+    st.board.remove_matches()
+    return elapsed
+
+def op_refill(st):
+    st.play_move()
+    st.board.check_matches()
+    elapsed = _timed(st.board.refill)
+    st.board.remove_matches()
+    return elapsed
+
+def op_remove_matches(st):
+    st.play_move()
+    return _timed(st.board.remove_matches)
+
+def op_find_hint(st):
+    elapsed = _timed(lambda: find_hint(st.board))
+    st.play_move()
+    st.board.remove_matches()
+    return elapsed
+
+def op_first_move(st):
+    elapsed = _timed(st.board.first_move)
+    st.play_move()
+    st.board.remove_matches()
+    return elapsed
+
+OPS = {
+    "init": op_init,
+    "check_matches_full": op_check_matches_full,
+    "check_matches": op_check_matches,
+    "check_local_matches": op_check_local_matches,
+    "swap": op_swap,
+    "refill": op_refill,
+    "remove_matches": op_remove_matches,
+    "find_hint": op_find_hint,
+    "first_move": op_first_move,
+}
+
+# Repeats one operation until it has run for min_time (at least min_reps times) and summarizes it.
+def run_op(op, st, min_time, min_reps=3, max_reps=2000):
+    samples = []
+    spent = 0.0
+    while len(samples) < max_reps and (len(samples) < min_reps or spent < min_time):
+        elapsed = OPS[op](st)
+        samples.append(elapsed)
+        spent += elapsed
+    return {
+        "reps": len(samples),
+        "mean_us": statistics.fmean(samples) * 1e6,
+        "median_us": statistics.median(samples) * 1e6,
+        "min_us": min(samples) * 1e6,
+    }
+
+def run(engines, sizes, ops, num_types, seed, min_time):
+    results = []
+    for engine in engines:
+        try:
+            cls = board_class(engine)
+            cls(3, 3, num_types)
+        except (ImportError, RuntimeError) as e:
+            print(f"Skipping {engine}: {e}", file=sys.stderr)
+            continue
+        for size in sizes:
+            st = BenchState(cls, size, num_types, seed)
+            for op in ops:
+                result = {"engine": engine, "size": size, "num_types": num_types, "op": op}
+                result.update(run_op(op, st, min_time))
+                results.append(result)
+                print(f"{engine:<9}{size:>5}  {op:<20}{result['median_us']:>12.1f} us  ({result['reps']} reps)", flush=True)
+    return results
+
+# Lists every (engine, size, op) whose median grew by more than `threshold` times since `baseline`.
+def compare(results, baseline, threshold):
+    old = {(r["engine"], r["size"], r["op"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        before = old.get((r["engine"], r["size"], r["op"]))
+        if before and before["median_us"] > 0:
+            ratio = r["median_us"] / before["median_us"]
+            if ratio > threshold:
+                regressions.append((r, before, ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Board hot paths across engines and board sizes.")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=ENGINES)
+    parser.add_argument("--sizes", type=int, nargs="+", default=LEVEL_SIZES + STRESS_SIZES, help="square board sizes")
+    parser.add_argument("--ops", nargs="+", default=list(OPS), choices=list(OPS))
+    parser.add_argument("--num-types", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds to spend on each measurement")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="earlier JSON results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    results = run(args.engines, args.sizes, args.ops, args.num_types, args.seed, args.min_time)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seed": args.seed,
+            "num_types": args.num_types,
+            "min_time": args.min_time,
+        },
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for r, before, ratio in regressions:
+            print(f"REGRESSION {r['engine']} {r['size']} {r['op']}: {before['median_us']:.1f} -> {r['median_us']:.1f} us ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print("No regressions.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import functools
+from array import array
+
+from board import COLORLESS, TYPE_MASK, Board, CellGrid, FallPlan
+from metrics import METRICS
+
+EMPTY = 255 # Cell value for holes and for the guard column
+
+# Yields the indices of the set bits of x, lowest first.
+def _bit_positions(x):
+    bits = bin(x)[:1:-1]
+    i = bits.find("1")
+    while i >= 0:
+        yield i
+        i = bits.find("1", i + 1)
+
+# Byte-translate tables that turn the cell bytes into '0'/'1' digits for one colour each, shared
+# by every board with the same number of colours.
+@functools.lru_cache(maxsize=None)
+def _mask_tables(num_types):
+    return [(t, bytes(ord("1") if v != EMPTY and v & TYPE_MASK == t else ord("0") for v in range(256)))
+            for t in list(range(num_types)) + [COLORLESS]]
+
+class BitBoard(Board):
+    # Board that keeps one integer bitmask per candy colour, indexed by the colour bits of the
+    # packed cell; masks[COLORLESS] holds the colour bombs. Cell (r, c) is bit r * stride + c,
+    # where stride = cols + 1 leaves an always-empty guard column so horizontal shifts never
+    # carry a run from one row into the next. Python ints grow as needed, so any board size works.
+    def __init__(self, rows, cols, num_types, types=None, seed=None):
+        self.stride = cols + 1
+        self._tables = _mask_tables(num_types)
+
+        S = self.stride
+        row = (1 << cols) - 1
+        self.full = sum(row << (r * S) for r in range(rows))
+        first_col = sum(1 << (r * S) for r in range(rows))
+        self.can_move_right = self.full & ~(first_col << (cols - 1))
+        self.can_move_left = self.full & ~first_col
+        self.can_move_down = self.full & ~(row << ((rows - 1) * S))
+        self.can_move_up = self.full & ~row
+        super().__init__(rows, cols, num_types, types, seed)
+
+    def _fill(self, types):
+        self.cells = bytearray([EMPTY]) * (self.rows * self.stride)
+        for r, row in enumerate(types):
+            self.cells[r * self.stride:r * self.stride + self.cols] = bytes(row)
+        self._rebuild_masks()
+        self.grid = CellGrid(self)
+
+    def cell_types(self):
+        S = self.stride
+        return [list(self.cells[r * S:r * S + self.cols]) for r in range(self.rows)]
+
+    def snapshot(self):
+        S = self.stride
+        return b"".join([self.cells[r * S:r * S + self.cols] for r in range(self.rows)])
+
+    def _rebuild_masks(self):
+        # Rebuilds every type mask from the cell bytes in C-speed passes (translate to '0'/'1', parse base 2).
+        reversed_cells = bytes(self.cells[::-1])
+        self.masks = [0] * (TYPE_MASK + 1)
+        for t, table in self._tables:
+            self.masks[t] = int(reversed_cells.translate(table), 2)
+
+    def type_at(self, r, c):
+        v = self.cells[r * self.stride + c]
+        return -1 if v == EMPTY else v & TYPE_MASK
+
+    def cell_at(self, r, c):
+        v = self.cells[r * self.stride + c]
+        return -1 if v == EMPTY else v
+
+    def set_cell(self, r, c, value):
+        b = r * self.stride + c
+        old = self.cells[b]
+        new = EMPTY if value < 0 else value
+        if old == new:
+            return
+        if old != EMPTY:
+            self.masks[old & TYPE_MASK] ^= 1 << b
+        if new != EMPTY:
+            self.masks[new & TYPE_MASK] |= 1 << b
+        self.cells[b] = new
+
+    def swap(self, r1, c1, r2, c2):
+        # Same rules as Board.swap; a swap moves both bits between the two type masks with one XOR each.
+        if not self.valid_indices(r1, c1) or not self.valid_indices(r2, c2):
+            return False
+        if not ((abs(r1 - r2) == 1 and c1 == c2) or (abs(c1 - c2) == 1 and r1 == r2)):
+            return False
+
+        b1, b2 = r1 * self.stride + c1, r2 * self.stride + c2
+        t1, t2 = self.cells[b1], self.cells[b2]
+        self._exchange(b1, b2, t1, t2)
+
+        if not (self._check_local_matches(r1, c1) or self._check_local_matches(r2, c2)):
+            self._exchange(b1, b2, t2, t1)
+            return False
+
+        self._record_swap(r1, c1, r2, c2)
+        return True
+
+    def _exchange(self, b1, b2, v1, v2):
+        # Swaps the cells at bits b1 (holding v1) and b2 (holding v2).
+        t1, t2 = v1 & TYPE_MASK, v2 & TYPE_MASK
+        if t1 != t2:
+            both = (1 << b1) | (1 << b2)
+            self.masks[t1] ^= both
+            self.masks[t2] ^= both
+        self.cells[b1], self.cells[b2] = v2, v1
+
+    def _check_local_matches(self, r, c):
+        # Counts the run through (r, c) in the cell bytes; the guard column ends every row.
+        cells = self.cells
+        S = self.stride
+        b = r * S + c
+        candy_type = cells[b] & TYPE_MASK
+        if candy_type == COLORLESS: return True
+
+        h_count = 1
+        i = b - 1
+        while i >= 0 and i >= b - 2 and cells[i] & TYPE_MASK == candy_type:
+            h_count += 1
+            i -= 1
+        i = b + 1
+        while i <= b + 2 and cells[i] & TYPE_MASK == candy_type:
+            h_count += 1
+            i += 1
+        if h_count >= 3: return True
+
+        v_count = 1
+        i = b - S
+        while i >= 0 and i >= b - 2 * S and cells[i] & TYPE_MASK == candy_type:
+            v_count += 1
+            i -= S
+        i = b + S
+        while i < len(cells) and i <= b + 2 * S and cells[i] & TYPE_MASK == candy_type:
+            v_count += 1
+            i += S
+        return v_count >= 3
+
+    def _match_mask(self):
+        # ORs together, for every type, the cells of each horizontal and vertical run of three or more.
+        S = self.stride
+        matched = 0
+        for m in self.masks[:self.num_types]:
+            h = m & (m >> 1) & (m >> 2)
+            v = m & (m >> S) & (m >> 2 * S)
+            matched |= h | (h << 1) | (h << 2) | v | (v << S) | (v << 2 * S)
+        return matched
+
+    def _positions(self, mask):
+        return {divmod(b, self.stride) for b in _bit_positions(mask)}
+
+    def _scan_all(self):
+        return self._positions(self._match_mask())
+
+    def _cells_of_type(self, t):
+        return self._positions(self.masks[t])
+
+    def _scan_dirty(self):
+        # A whole-board mask scan costs a few big-int operations per type, so dirty cells only
+        # decide whether a scan is needed at all.
+        if not self._dirty:
+            return set()
+        return self._scan_all()
+
+    def _move_masks(self):
+        # Returns (right, down): bit o of right is set when swapping o with its right neighbour
+        # forms a match, and likewise for down. A candy moving from o to p = o + d matches when
+        # two cells of its colour sit in line with p, not counting o itself; any swap with a
+        # colour bomb is valid.
+        S = self.stride
+        full = self.full
+
+        def at(m, k):
+            # Bit i of the result is bit i + k of m.
+            return m >> k if k >= 0 else (m << -k) & full
+
+        def lands(m, d):
+            # Origins of type m whose candy would complete a run after moving by d.
+            hits = 0
+            for a, b in ((1, 2), (-1, -2), (-1, 1), (S, 2 * S), (-S, -2 * S), (-S, S)):
+                if -d not in (a, b):
+                    hits |= at(m, d + a) & at(m, d + b)
+            return m & hits
+
+        bombs = self.masks[COLORLESS]
+        right = (bombs & self.can_move_right) | ((bombs & self.can_move_left) >> 1)
+        down = (bombs & self.can_move_down) | ((bombs & self.can_move_up) >> S)
+        for m in self.masks[:self.num_types]:
+            right |= (lands(m, 1) & self.can_move_right) | ((lands(m, -1) & self.can_move_left) >> 1)
+            down |= (lands(m, S) & self.can_move_down) | ((lands(m, -S) & self.can_move_up) >> S)
+        return right, down
+
+    def valid_moves(self):
+        # Derives every valid move from the type masks, with no per-cell swapping.
+        right, down = self._move_masks()
+        moves = {((r, c), (r, c + 1)) for r, c in self._positions(right)}
+        moves.update(((r, c), (r + 1, c)) for r, c in self._positions(down))
+        return frozenset(moves)
+
+    def first_move(self):
+        # Returns the valid move whose first cell has the lowest bit index.
+        right, down = self._move_masks()
+        if not (right or down):
+            return None
+        lowest = lambda m: (m & -m).bit_length() - 1 if m else None
+        br, bd = lowest(right), lowest(down)
+        if bd is None or (br is not None and br <= bd):
+            r, c = divmod(br, self.stride)
+            return (r, c), (r, c + 1)
+        r, c = divmod(bd, self.stride)
+        return (r, c), (r + 1, c)
+
+    def has_moves(self):
+        right, down = self._move_masks()
+        return bool(right or down)
+
+    def _collapse(self):
+        # Empties matched cells and drops the survivors of each touched column with one
+        # strided slice assignment. The masks are left stale until _spawn rebuilds them.
+        touched = self._mark_columns_dirty()
+        cells = self.cells
+        S = self.stride
+        for r, c in self.matches:
+            cells[r * S + c] = EMPTY
+
+        cols = sorted(touched)
+        spawned = array("H")
+        shifts = []
+        for c in cols:
+            low = touched[c]
+            column = cells[c:(low + 1) * S:S]
+            kept = column.replace(bytes([EMPTY]), b"")
+            top = low + 1 - len(kept)
+            cells[c + top * S:(low + 1) * S:S] = kept
+            cells[c:top * S:S] = bytes([EMPTY]) * top
+
+            shift = array("H", [top]) * (low + 1)
+            r = low
+            for src in range(low, -1, -1):
+                if column[src] != EMPTY:
+                    shift[r] = r - src
+                    r -= 1
+            spawned.append(top)
+            shifts.append(shift)
+        return FallPlan(cols, spawned, shifts)
+
+    def _spawn(self, plan):
+        cells = self.cells
+        S = self.stride
+        for c, count in zip(plan.cols, plan.spawned):
+            for r in range(count):
+                cells[r * S + c] = self.rng.randint(0, self.num_types - 1)
+        self._rebuild_masks()
+
+METRICS.instrument(BitBoard, swap="swap")
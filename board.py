@@ -0,0 +1,742 @@
+import random
+from array import array
+from collections import namedtuple
+
+from metrics import METRICS
+
+# A cell is one packed int: the candy's colour in the low four bits and its special kind
+# above them. Colour bombs have no colour, so they never take part in a run.
+TYPE_MASK = 0x0F
+SPECIAL_SHIFT = 4
+NORMAL, STRIPED_H, STRIPED_V, WRAPPED, COLOR_BOMB = range(5) # Striped H clears its row, striped V its column
+COLORLESS = TYPE_MASK
+COLOR_BOMB_CELL = COLORLESS | COLOR_BOMB << SPECIAL_SHIFT
+CELL_VALUES = (COLOR_BOMB + 1) << SPECIAL_SHIFT # Every packed value is below this
+
+POINTS_PER_CANDY = 10
+RESHUFFLE_ATTEMPTS = 10
+
+# Returns the colours that would complete a run of three through (r, c), given the colours
+# placed so far in `colors` (-1 for cells not placed yet).
+def _blocked_colors(colors, r, c, rows, cols):
+    blocked = set()
+    row = colors[r]
+    for a2, a1, b1, b2 in ((row[c - 2] if c >= 2 else -1, row[c - 1] if c >= 1 else -1,
+                            row[c + 1] if c + 1 < cols else -1, row[c + 2] if c + 2 < cols else -1),
+                           (colors[r - 2][c] if r >= 2 else -1, colors[r - 1][c] if r >= 1 else -1,
+                            colors[r + 1][c] if r + 1 < rows else -1, colors[r + 2][c] if r + 2 < rows else -1)):
+        if a1 >= 0 and (a1 == a2 or a1 == b1):
+            blocked.add(a1)
+        if b1 >= 0 and b1 == b2:
+            blocked.add(b1)
+    blocked.discard(COLORLESS)
+    return blocked
+
+# Picks a value from [(value, count)] with probability proportional to its count.
+def _weighted_pick(weighted, rng):
+    i = rng.randrange(sum(n for _, n in weighted))
+    for v, n in weighted:
+        if i < n:
+            return v
+        i -= n
+    raise ValueError("Nothing left to pick")
+
+class Candy:
+    def __init__(self, value):
+        self.value = value
+        self.image_index = value & TYPE_MASK
+        self.special = value >> SPECIAL_SHIFT
+
+class FallPlan:
+    # What one refill did to the board. For each touched column cols[i], spawned[i] new candies
+    # entered at the top and shifts[i][r] is how many rows the candy now at row r fell; rows past
+    # the end of shifts[i] did not move. Spawned candies start above the board, so the candy at
+    # row r always came from row r - shifts[i][r].
+    __slots__ = ("cols", "spawned", "shifts")
+
+    def __init__(self, cols=(), spawned=(), shifts=()):
+        self.cols = cols
+        self.spawned = spawned
+        self.shifts = shifts
+
+    def __bool__(self):
+        return len(self.cols) > 0
+
+    def moves(self):
+        # Yields (col, start_row, end_row) for every candy that fell or was spawned.
+        for c, shift in zip(self.cols, self.shifts):
+            for r, s in enumerate(shift):
+                if s:
+                    yield c, r - int(s), r
+
+# Events of one resolved move. Board.cascade() yields Matched, Scored, Fell and Spawned for
+# every step of the cascade; Game.turn() passes them on and closes the move with Settled.
+Matched = namedtuple("Matched", "cells created") # Cells being cleared (still on the board) and the specials they leave, {(r, c): value}
+Scored = namedtuple("Scored", "points")
+Fell = namedtuple("Fell", "plan") # FallPlan of the collapse and refill, already applied to the board
+Spawned = namedtuple("Spawned", "cells") # ((r, c, value), ...) for each new candy
+Settled = namedtuple("Settled", "score moves_left won over reshuffled")
+
+class Board:
+    # When set, every incremental match scan is checked against a full rescan.
+    verify_matches = False
+
+    def __init__(self, rows, cols, num_types, types=None, seed=None):
+        # Generates a random board with no matches and at least one valid move, or takes an
+        # exact layout from `types` (rows of packed cell values, or the bytes of a snapshot) as it is.
+        # Every random draw of the board, from this layout to each refill, comes from its own
+        # generator, so the same seed and the same swaps always give the same game.
+        self.rng = random.Random(seed)
+        self.rows = rows
+        self.cols = cols
+        self.num_types = num_types
+        # Candy objects are shared by every cell holding the same value; special ones are made on first use.
+        self.candies = [Candy(t) for t in range(num_types)] + [None] * (CELL_VALUES - num_types)
+        self.created = {} # Special candies the current matches will leave behind, {(r, c): value}
+        self._swapped = None # The cells of the swap whose matches have not been cleared yet
+        self._bomb_targets = {} # Swapped colour bombs and the colour each one was swapped with
+        clean = True
+        if types is None:
+            types, clean = self._layout()
+        elif isinstance(types, bytes):
+            types = self._split(types)
+        self._fill(types)
+        self.matches = set()
+        self._dirty = None # Cells changed since the last scan; None forces a full scan
+        self.version = 0 # Bumped by every change to the layout, so copies can tell they are stale
+        if not clean:
+            self.remove_matches()
+
+    def _fill(self, types):
+        candy = self._candy
+        self.grid = [[candy(v) for v in row] for row in types]
+
+    def _candy(self, value):
+        # Returns the shared Candy for a packed cell value.
+        candy = self.candies[value]
+        if candy is None:
+            candy = self.candies[value] = Candy(value)
+        return candy
+
+    def cell_types(self):
+        # Returns the layout as rows of packed cell values.
+        return [[candy.value for candy in row] for row in self.grid]
+
+    def _layout(self, pool=None):
+        # Lays out a whole board in one pass. Three cells forming a valid move are planted first,
+        # then every other cell takes a colour that completes no run with the cells already
+        # placed. Cells get random plain candies, or with `pool` ({packed value: count}) values
+        # drawn from it, so the board ends up holding exactly those candies. Returns
+        # (rows of values, clean); clean is False if some cell had no colour left that avoided a run.
+        rows, cols = self.rows, self.cols
+        values = [[-1] * cols for _ in range(rows)]
+        colors = [[-1] * cols for _ in range(rows)]
+        for r, c, v in self._plant(pool):
+            values[r][c] = v
+            colors[r][c] = v & TYPE_MASK
+
+        clean = True
+        for r in range(rows):
+            for c in range(cols):
+                if values[r][c] >= 0:
+                    continue
+                blocked = _blocked_colors(colors, r, c, rows, cols)
+                if pool is None:
+                    allowed = [t for t in range(self.num_types) if t not in blocked]
+                    v = self.rng.choice(allowed or range(self.num_types))
+                else:
+                    allowed = [(v, n) for v, n in pool.items() if n and v & TYPE_MASK not in blocked]
+                    v = _weighted_pick(allowed or [(v, n) for v, n in pool.items() if n], self.rng)
+                    pool[v] -= 1
+                if not allowed:
+                    clean = False
+                values[r][c] = v
+                colors[r][c] = v & TYPE_MASK
+        return values, clean
+
+    def _plant(self, pool):
+        # Picks three cells that make a valid move (a a . over . . a: swapping the last one up
+        # makes a row of three), or its transpose on boards too narrow for it, and values of one
+        # colour for them. Returns [(r, c, value)]; empty when the board is too small or the pool
+        # has no colour with three candies (a colour bomb in the pool already makes a move).
+        if self.cols >= 3 and self.rows >= 2:
+            r, c = self.rng.randrange(self.rows - 1), self.rng.randrange(self.cols - 2)
+            cells = [(r, c), (r, c + 1), (r + 1, c + 2)]
+        elif self.rows >= 3 and self.cols >= 2:
+            r, c = self.rng.randrange(self.rows - 2), self.rng.randrange(self.cols - 1)
+            cells = [(r, c), (r + 1, c), (r + 2, c + 1)]
+        else:
+            return []
+        if pool is None:
+            color = self.rng.randrange(self.num_types)
+            return [(r, c, color) for r, c in cells]
+
+        counts = {}
+        for v, n in pool.items():
+            if v & TYPE_MASK != COLORLESS:
+                counts[v & TYPE_MASK] = counts.get(v & TYPE_MASK, 0) + n
+        colors = sorted(t for t, n in counts.items() if n >= 3)
+        if not colors:
+            return []
+        color = self.rng.choice(colors)
+        planted = []
+        for r, c in cells:
+            v = _weighted_pick([(v, n) for v, n in pool.items() if n and v & TYPE_MASK == color], self.rng)
+            pool[v] -= 1
+            planted.append((r, c, v))
+        return planted
+
+    def reshuffle(self):
+        # Rearranges the candies already on the board, specials included, into a layout with
+        # no matches and at least one valid move.
+        pool = {}
+        for v in self.snapshot():
+            pool[v] = pool.get(v, 0) + 1
+        for _ in range(RESHUFFLE_ATTEMPTS):
+            values, clean = self._layout(dict(pool))
+            if clean:
+                break
+        self.restore(bytes(v for row in values for v in row))
+        if not clean:
+            self.remove_matches() # Every attempt ran out of colours somewhere; clear what lined up
+
+    def ensure_moves(self):
+        # Reshuffles the board if no valid move is left. Returns True when it had to.
+        if self.has_moves():
+            return False
+        self.reshuffle()
+        return True
+
+    def snapshot(self):
+        # Returns the layout as rows * cols bytes, one packed cell value each, row by row.
+        # Between moves no cell is empty, so every value fits in a byte.
+        return bytes([candy.value for row in self.grid for candy in row])
+
+    def _split(self, data):
+        return [data[r * self.cols:(r + 1) * self.cols] for r in range(self.rows)]
+
+    def restore(self, data):
+        # Puts back a layout taken with snapshot(). Pending matches are dropped and the next
+        # match scan covers the whole board.
+        self._fill(self._split(data))
+        self.matches = set()
+        self.created = {}
+        self._swapped = None
+        self._bomb_targets = {}
+        self._dirty = None
+        self.version += 1
+
+    def copy(self):
+        # Returns an independent board with the same layout and random state, for search and simulation.
+        board = type(self)(self.rows, self.cols, self.num_types, types=self.snapshot())
+        board.rng.setstate(self.rng.getstate())
+        return board
+
+    def swap(self, r1, c1, r2, c2):
+        # Swaps two adjacent candies if the swap results in a match.
+        if not self.valid_indices(r1, c1) or not self.valid_indices(r2, c2):
+            return False
+        if not ((abs(r1 - r2) == 1 and c1 == c2) or (abs(c1 - c2) == 1 and r1 == r2)):
+            return False
+
+        self.grid[r1][c1], self.grid[r2][c2] = self.grid[r2][c2], self.grid[r1][c1]
+
+        if not (self._check_local_matches(r1, c1) or self._check_local_matches(r2, c2)):
+            self.grid[r1][c1], self.grid[r2][c2] = self.grid[r2][c2], self.grid[r1][c1]
+            return False
+
+        self._record_swap(r1, c1, r2, c2)
+        return True
+
+    def _record_swap(self, r1, c1, r2, c2):
+        # Marks both cells of a successful swap as changed and remembers where it happened, so
+        # new special candies appear at the swapped cell and a swapped colour bomb goes off.
+        self._mark_dirty(r1, c1)
+        self._mark_dirty(r2, c2)
+        self._swapped = ((r1, c1), (r2, c2))
+        for (r, c), other in (((r1, c1), (r2, c2)), ((r2, c2), (r1, c1))):
+            if self.cell_at(r, c) == COLOR_BOMB_CELL:
+                self._bomb_targets[(r, c)] = self.type_at(*other)
+
+    def valid_indices(self, r, c):
+        # Checks if the given row and column are within the board's bounds.
+        return 0 <= r < self.rows and 0 <= c < self.cols
+
+    def type_at(self, r, c):
+        # Returns the colour of the candy at a cell (COLORLESS for a colour bomb).
+        return self.grid[r][c].image_index
+
+    def cell_at(self, r, c):
+        # Returns the packed value of a cell, or -1 while it is empty.
+        candy = self.grid[r][c]
+        return -1 if candy is None else candy.value
+
+    def set_cell(self, r, c, value):
+        self.grid[r][c] = None if value < 0 else self._candy(value)
+
+    def _check_local_matches(self, r, c):
+        # Efficiently checks for a match only around a specific candy's location.
+        # A colour bomb matches anything it is swapped with.
+        grid = self.grid
+        row = grid[r]
+        candy_type = row[c].image_index
+        if candy_type == COLORLESS: return True
+
+        h_count = 1
+        i = c - 1
+        while i >= 0 and i >= c - 2 and row[i].image_index == candy_type:
+            h_count += 1
+            i -= 1
+        i = c + 1
+        while i < self.cols and i <= c + 2 and row[i].image_index == candy_type:
+            h_count += 1
+            i += 1
+        if h_count >= 3: return True
+
+        v_count = 1
+        i = r - 1
+        while i >= 0 and i >= r - 2 and grid[i][c].image_index == candy_type:
+            v_count += 1
+            i -= 1
+        i = r + 1
+        while i < self.rows and i <= r + 2 and grid[i][c].image_index == candy_type:
+            v_count += 1
+            i += 1
+        if v_count >= 3: return True
+        return False
+
+    def _mark_dirty(self, r, c):
+        self.version += 1
+        if self._dirty is not None:
+            self._dirty.add((r, c))
+
+    def _mark_columns_dirty(self):
+        # Marks every cell that refilling the current matches will move or replace,
+        # and returns the lowest such row for each touched column.
+        self.version += 1
+        lowest = {}
+        for r, c in self.matches:
+            if lowest.get(c, -1) < r:
+                lowest[c] = r
+        if self._dirty is not None:
+            for c, low in lowest.items():
+                self._dirty.update((r, c) for r in range(low + 1))
+        return lowest
+
+    def _is_valid_move(self, r1, c1, r2, c2):
+        # Checks whether swapping two adjacent cells would form a match, leaving the board as it was.
+        grid = self.grid
+        grid[r1][c1], grid[r2][c2] = grid[r2][c2], grid[r1][c1]
+        valid = self._check_local_matches(r1, c1) or self._check_local_matches(r2, c2)
+        grid[r1][c1], grid[r2][c2] = grid[r2][c2], grid[r1][c1]
+        return valid
+
+    def has_moves(self):
+        # Reports whether any swap on the board would form a match.
+        return self.first_move() is not None
+
+    def first_move(self):
+        # Returns the first valid move in row-major order, the swap to the right before the one
+        # below at each cell, as ((r1, c1), (r2, c2)), or None when the board is deadlocked.
+        # Every engine returns the same move. A move nearly always turns up in the first rows,
+        # so this early-exit scan beats keeping an index of valid moves up to date after every
+        # cascade; only a deadlocked board is scanned to the end.
+        valid = self._is_valid_move
+        for r in range(self.rows):
+            for c in range(self.cols):
+                if c + 1 < self.cols and valid(r, c, r, c + 1):
+                    return (r, c), (r, c + 1)
+                if r + 1 < self.rows and valid(r, c, r + 1, c):
+                    return (r, c), (r + 1, c)
+        return None
+
+    def valid_moves(self):
+        # Returns every valid move on the board, trying each adjacent swap.
+        valid = self._is_valid_move
+        moves = {((r, c), (r, c + 1)) for r in range(self.rows) for c in range(self.cols - 1) if valid(r, c, r, c + 1)}
+        moves.update(((r, c), (r + 1, c)) for r in range(self.rows - 1) for c in range(self.cols) if valid(r, c, r + 1, c))
+        return frozenset(moves)
+
+    def check_matches(self, full=False):
+        # Finds all horizontal and vertical matches and the cells their special candies blast.
+        # Only the runs through cells changed since the last scan are re-evaluated, unless
+        # full is set or nothing is known yet. self.matches becomes every cell to clear and
+        # self.created the special candies the matches leave behind.
+        if full or self._dirty is None:
+            runs = self._scan_all()
+        else:
+            runs = self._scan_dirty()
+            if self.verify_matches:
+                expected = self._scan_all()
+                if runs != expected:
+                    raise RuntimeError(f"Incremental match scan missed {expected - runs} and invented {runs - expected}")
+
+        # Matched candies stay on the board until refill, so they remain dirty.
+        self._dirty = set(runs)
+        self.matches, self.created = self._resolve(runs)
+        return len(self.matches) > 0
+
+    def _resolve(self, runs):
+        # Returns (cells to clear, specials to create). Only the matches a swap makes create
+        # specials: cascades on big boards would otherwise keep making blasts that feed
+        # further cascades without end. Every special candy that is cleared goes off, and so
+        # does every special its blast reaches, until no new one is hit.
+        created = self._shapes(runs) if runs and self._swapped else {}
+        cleared = set(runs)
+        cleared.update(self._bomb_targets)
+        pending = [cell for cell in cleared if self.cell_at(*cell) >> SPECIAL_SHIFT]
+        fired = set()
+        while pending:
+            cell = pending.pop()
+            if cell in fired:
+                continue
+            fired.add(cell)
+            hit = self._blast(cell) - cleared
+            cleared |= hit
+            pending.extend(x for x in hit if self.cell_at(*x) >> SPECIAL_SHIFT)
+        cleared.difference_update(created)
+        return cleared, created
+
+    def _blast(self, cell):
+        # Returns the cells a special candy clears when it goes off.
+        r, c = cell
+        special = self.cell_at(r, c) >> SPECIAL_SHIFT
+        if special == STRIPED_H:
+            return {(r, i) for i in range(self.cols)}
+        if special == STRIPED_V:
+            return {(i, c) for i in range(self.rows)}
+        if special == WRAPPED:
+            return {(i, j) for i in range(max(r - 1, 0), min(r + 2, self.rows))
+                    for j in range(max(c - 1, 0), min(c + 2, self.cols))}
+        # A colour bomb takes the colour it was swapped with (all of them for another bomb);
+        # one set off by a blast takes the most common colour.
+        color = self._bomb_targets.get(cell)
+        if color == COLORLESS:
+            return {(i, j) for i in range(self.rows) for j in range(self.cols)}
+        if color is None:
+            color = max(range(self.num_types), key=lambda t: len(self._cells_of_type(t)))
+        return self._cells_of_type(color) | {cell}
+
+    def _cells_of_type(self, t):
+        return {(r, c) for r, row in enumerate(self.grid) for c, candy in enumerate(row)
+                if candy is not None and candy.image_index == t}
+
+    def _shapes(self, runs):
+        # Works out which special candies the matched runs make, from the run cells alone:
+        # five in a line makes a colour bomb, a row crossing a column (L or T) a wrapped candy
+        # and four in a line a striped one. A line's special goes at the swapped cell if that is
+        # part of the line, otherwise in its middle; a wrapped candy goes where the lines cross.
+        color = {cell: self.type_at(*cell) for cell in runs}
+        lines = []
+        for horizontal in (True, False):
+            line = []
+            for cell in sorted(runs, key=(lambda x: x) if horizontal else (lambda x: (x[1], x[0]))):
+                if line:
+                    r, c = line[-1]
+                    follows = cell == ((r, c + 1) if horizontal else (r + 1, c))
+                    if follows and color[cell] == color[line[-1]]:
+                        line.append(cell)
+                        continue
+                    if len(line) >= 3:
+                        lines.append((horizontal, line))
+                line = [cell]
+            if len(line) >= 3:
+                lines.append((horizontal, line))
+
+        created = {}
+        used = set()
+        swapped = self._swapped or ()
+
+        def place(i, cells, value):
+            spot = next((x for x in cells if x in swapped), cells[len(cells) // 2])
+            if spot not in created:
+                created[spot] = value
+                used.add(i)
+
+        for i, (horizontal, line) in enumerate(lines):
+            if len(line) >= 5:
+                place(i, line, COLOR_BOMB_CELL)
+
+        across = {cell: i for i, (horizontal, line) in enumerate(lines) if horizontal for cell in line}
+        for j, (horizontal, line) in enumerate(lines):
+            if horizontal or j in used:
+                continue
+            for cell in line:
+                i = across.get(cell)
+                if i is not None and i not in used:
+                    place(i, [cell], color[cell] | WRAPPED << SPECIAL_SHIFT)
+                    used.add(j)
+                    break
+
+        for i, (horizontal, line) in enumerate(lines):
+            if len(line) == 4 and i not in used:
+                place(i, line, color[line[0]] | (STRIPED_V if horizontal else STRIPED_H) << SPECIAL_SHIFT)
+        return created
+
+    def _scan_dirty(self):
+        # Measures the horizontal and vertical run through each dirty cell.
+        grid = self.grid
+        matches = set()
+        h_seen = set()
+        v_seen = set()
+        for r, c in self._dirty:
+            candy_type = grid[r][c].image_index
+            if candy_type == COLORLESS:
+                continue
+            if (r, c) not in h_seen:
+                start, end = c, c
+                while start > 0 and grid[r][start - 1].image_index == candy_type:
+                    start -= 1
+                while end + 1 < self.cols and grid[r][end + 1].image_index == candy_type:
+                    end += 1
+                run = [(r, i) for i in range(start, end + 1)]
+                h_seen.update(run)
+                if len(run) >= 3:
+                    matches.update(run)
+            if (r, c) not in v_seen:
+                start, end = r, r
+                while start > 0 and grid[start - 1][c].image_index == candy_type:
+                    start -= 1
+                while end + 1 < self.rows and grid[end + 1][c].image_index == candy_type:
+                    end += 1
+                run = [(i, c) for i in range(start, end + 1)]
+                v_seen.update(run)
+                if len(run) >= 3:
+                    matches.update(run)
+        return matches
+
+    def _scan_all(self):
+        # Scans the entire board for all horizontal and vertical matches.
+        matches = set()
+        for r in range(self.rows):
+            start_c = 0
+            for c in range(1, self.cols + 1):
+                if c == self.cols or self.grid[r][c].image_index != self.grid[r][start_c].image_index:
+                    if c - start_c >= 3 and self.grid[r][start_c].image_index != COLORLESS:
+                        matches.update([(r, i) for i in range(start_c, c)])
+                    start_c = c
+
+        for c in range(self.cols):
+            start_r = 0
+            for r in range(1, self.rows + 1):
+                if r == self.rows or self.grid[r][c].image_index != self.grid[start_r][c].image_index:
+                    if r - start_r >= 3 and self.grid[start_r][c].image_index != COLORLESS:
+                        matches.update([(i, c) for i in range(start_r, r)])
+                    start_r = r
+
+        return matches
+
+    def get_match_positions(self):
+        # Finds and returns the positions of all matched candies.
+        self.check_matches()
+        return list(self.matches)
+
+    def cascade(self):
+        # Resolves the pending matches one cascade step at a time as a stream of events. A step
+        # is only computed when the consumer asks for its first event, so an animating consumer
+        # paces the engine and a headless one runs it flat out. Same board changes and random
+        # draws as remove_matches(), which skips the events for search and benchmarks.
+        while self.check_matches():
+            cells = self.matches
+            yield Matched(cells, dict(self.created))
+            yield Scored(len(cells) * POINTS_PER_CANDY)
+            plan = self.refill()
+            yield Fell(plan)
+            yield Spawned(tuple((r, c, self.cell_at(r, c)) for c, n in zip(plan.cols, plan.spawned) for r in range(n)))
+
+    def remove_matches(self):
+        # Removes all matched candies and refills the board with new ones from the top.
+        total_removed = 0
+        while self.check_matches():
+            total_removed += len(self.matches)
+            self._place_specials()
+            self._spawn(self._collapse())
+        return total_removed
+
+    def refill(self):
+        # Updates the board model after a match and returns a FallPlan for the falling animations.
+        if not self.matches:
+            return FallPlan()
+        self._place_specials()
+        plan = self._collapse()
+        self._spawn(plan)
+        return plan
+
+    def _place_specials(self):
+        # Turns the cells in self.created into their special candies, ready for the collapse,
+        # and ends the swap: later cascade steps neither place specials at it nor fire its bombs.
+        for (r, c), value in self.created.items():
+            self.set_cell(r, c, value)
+            self._mark_dirty(r, c)
+        self.created = {}
+        self._swapped = None
+        self._bomb_targets = {}
+
+    def _collapse(self):
+        # Clears the matched cells and drops the survivors of every touched column in one pass
+        # per column, leaving the top spawned[i] cells of each empty. Returns the FallPlan.
+        touched = self._mark_columns_dirty()
+        grid = self.grid
+        for r, c in self.matches:
+            grid[r][c] = None
+
+        cols = sorted(touched)
+        spawned = array("H")
+        shifts = []
+        for c in cols:
+            low = touched[c]
+            shift = array("H", [0]) * (low + 1)
+            gap = 0
+            for r in range(low, -1, -1):
+                candy = grid[r][c]
+                if candy is None:
+                    gap += 1
+                elif gap:
+                    grid[r + gap][c] = candy
+                    shift[r + gap] = gap
+            for r in range(gap):
+                shift[r] = gap
+            spawned.append(gap)
+            shifts.append(shift)
+        return FallPlan(cols, spawned, shifts)
+
+    def _spawn(self, plan):
+        # Fills the cells a collapse left empty, column by column and top down.
+        candies = self.candies
+        for c, count in zip(plan.cols, plan.spawned):
+            for r in range(count):
+                self.grid[r][c] = candies[self.rng.randint(0, self.num_types - 1)]
+
+METRICS.instrument(Board, swap="swap", check_matches="check_matches", refill="refill", remove_matches="remove_matches")
+
+class _CellRow:
+    # One row of an integer-backed board, read and written as Candy objects.
+    def __init__(self, board, r):
+        self.board = board
+        self.r = r
+
+    def __len__(self):
+        return self.board.cols
+
+    def __iter__(self):
+        return (self[c] for c in range(self.board.cols))
+
+    def __getitem__(self, c):
+        value = self.board.cell_at(self.r, c)
+        return None if value < 0 else self.board._candy(value)
+
+    def __setitem__(self, c, candy):
+        self.board.set_cell(self.r, c, -1 if candy is None else candy.value)
+
+class CellGrid:
+    # Lets code written against Board.grid keep working on integer-backed boards.
+    def __init__(self, board):
+        self.board = board
+
+    def __len__(self):
+        return self.board.rows
+
+    def __iter__(self):
+        return (_CellRow(self.board, r) for r in range(self.board.rows))
+
+    def __getitem__(self, r):
+        return _CellRow(self.board, r)
+
+def find_hint(board):
+    # Finds the first valid move in row-major order by swapping in the grid directly. Every
+    # engine's first_move returns this same move; this stays as the plain reference for them.
+    grid = board.grid
+    for r in range(board.rows):
+        for c in range(board.cols):
+            if c + 1 < board.cols:
+                grid[r][c], grid[r][c + 1] = grid[r][c + 1], grid[r][c]
+                found = board._check_local_matches(r, c) or board._check_local_matches(r, c + 1)
+                grid[r][c], grid[r][c + 1] = grid[r][c + 1], grid[r][c] # Swap back
+                if found:
+                    return (r, c), (r, c + 1)
+            if r + 1 < board.rows:
+                grid[r][c], grid[r + 1][c] = grid[r + 1][c], grid[r][c]
+                found = board._check_local_matches(r, c) or board._check_local_matches(r + 1, c)
+                grid[r][c], grid[r + 1][c] = grid[r + 1][c], grid[r][c] # Swap back
+                if found:
+                    return (r, c), (r + 1, c)
+    return None
+
+ENGINES = ("list", "numpy", "bitboard")
+
+def board_class(engine="list"):
+    # Maps an engine name to its Board class, importing optional backends only when asked for.
+    if engine == "list":
+        return Board
+    if engine == "numpy":
+        from numpy_board import NumpyBoard
+        return NumpyBoard
+    if engine == "bitboard":
+        from bitboard import BitBoard
+        return BitBoard
+    raise ValueError(f"Unknown board engine: {engine}")
+
+LEVELS = [
+    {"score_goal": 550, "moves": 15, "board_size": (5, 5), "num_types": 4, "difficulty": "Easy"},
+    {"score_goal": 700, "moves": 13, "board_size": (5, 5), "num_types": 5, "difficulty": "Easy"},
+    {"score_goal": 800, "moves": 15, "board_size": (6, 6), "num_types": 5, "difficulty": "Medium"},
+    {"score_goal": 900, "moves": 20, "board_size": (6, 6), "num_types": 6, "difficulty": "Medium"},
+    {"score_goal": 1000, "moves": 20, "board_size": (7, 7), "num_types": 6, "difficulty": "Hard"},
+    {"score_goal": 1100, "moves": 20, "board_size": (7, 7), "num_types": 7, "difficulty": "Hard"},
+    {"score_goal": 1200, "moves": 20, "board_size": (8, 8), "num_types": 7, "difficulty": "Very Hard"},
+    {"score_goal": 1300, "moves": 20, "board_size": (8, 8), "num_types": 8, "difficulty": "Very Hard"},
+    {"score_goal": 1400, "moves": 20, "board_size": (8, 8), "num_types": 8, "difficulty": "Expert"},
+    {"score_goal": 1500, "moves": 20, "board_size": (8, 8), "num_types": 9, "difficulty": "Expert"}
+]
+
+class Game:
+    # Headless state of one level: the board, score and remaining moves, with no Tk involved.
+    def __init__(self, level, board_class=Board, failed_attempts=0, seed=None):
+        # A game is fully determined by its level, failed attempts, seed and the swaps in self.log.
+        config = LEVELS[level]
+        rows, cols = config["board_size"]
+        self.level = level
+        self.failed_attempts = failed_attempts
+        self.seed = random.randrange(1 << 64) if seed is None else seed
+        self.board = board_class(rows, cols, config["num_types"], seed=self.seed)
+        self.log = [] # Valid swaps played, as (r1, c1, r2, c2)
+        self.score = 0
+        self.score_goal = config["score_goal"]
+        self.moves = config["moves"] + failed_attempts * 5
+        self.moves_left = self.moves
+
+    @property
+    def moves_used(self):
+        return self.moves - self.moves_left
+
+    @property
+    def won(self):
+        return self.score >= self.score_goal
+
+    def is_over(self):
+        return self.won or self.moves_left <= 0
+
+    def turn(self, r1, c1, r2, c2):
+        # Applies a swap and returns its events: the board's cascade, with the score following
+        # the Scored events, then Settled once the board is still, after reshuffling it if it
+        # was left without moves. Returns None if the swap is invalid.
+        if not self.board.swap(r1, c1, r2, c2):
+            return None
+        self.moves_left -= 1
+        self.log.append((r1, c1, r2, c2))
+        return self._resolve()
+
+    def _resolve(self):
+        for event in self.board.cascade():
+            if type(event) is Scored:
+                self.score += event.points
+            yield event
+        reshuffled = not self.is_over() and self.board.ensure_moves()
+        yield Settled(self.score, self.moves_left, self.won, self.is_over(), reshuffled)
+
+    def play(self, r1, c1, r2, c2):
+        # Plays a whole turn. Returns the points scored, or None if the swap is invalid.
+        events = self.turn(r1, c1, r2, c2)
+        if events is None:
+            return None
+        return sum(event.points for event in events if type(event) is Scored)
@@ -1,218 +1,65 @@
+import time
+STARTED = time.perf_counter() # Taken before the other imports so time-to-first-frame covers them
 import tkinter as tk
 from tkinter import messagebox
-import random
-import os
-from PIL import Image, ImageTk
-from PIL import ImageFilter, ImageEnhance
-# === Setup path for assets ===
-try:
-    ASSET_PATH = os.path.dirname(os.path.abspath(__file__))
-except NameError:
-    ASSET_PATH = os.getcwd()
-
-# Loads, resizes, and returns a candy image or a colored block as a fallback.
-def load_image(index):
-    TARGET_SIZE = (58, 58)
-    path = os.path.join(ASSET_PATH, f"candy{index}.png")
-    try:
-        img = Image.open(path)
-        img = img.resize(TARGET_SIZE, Image.Resampling.LANCZOS)
-        return ImageTk.PhotoImage(img)
-    except Exception:
-        img = tk.PhotoImage(width=60, height=60)
-        color = ["red", "blue", "green", "yellow", "purple", "orange", "cyan", "pink"]
-        img.put(color[index % len(color)], to=(0, 0, 60, 60))
-        return img
-
-class Candy:
-    def __init__(self, image_index, image_list):
-        self.image_index = image_index
-        self.image_list = image_list
-
-    @property
-    def image(self):
-        return self.image_list[self.image_index]
-
-class Board:
-    def __init__(self, rows, cols, num_types, image_list):
-        self.rows = rows
-        self.cols = cols
-        self.num_types = num_types
-        self.image_list = image_list
-        self.grid = [[Candy(random.randint(0, num_types - 1), self.image_list) for _ in range(cols)] for _ in range(rows)]
-        self.matches = set()
-        self.remove_matches()
-
-    def swap(self, r1, c1, r2, c2):
-        # Swaps two adjacent candies if the swap results in a match.
-        if not self.valid_indices(r1, c1) or not self.valid_indices(r2, c2):
-            return False
-        if not ((abs(r1 - r2) == 1 and c1 == c2) or (abs(c1 - c2) == 1 and r1 == r2)):
-            return False
-
-        self.grid[r1][c1], self.grid[r2][c2] = self.grid[r2][c2], self.grid[r1][c1]
-
-        if not (self._check_local_matches(r1, c1) or self._check_local_matches(r2, c2)):
-            self.grid[r1][c1], self.grid[r2][c2] = self.grid[r2][c2], self.grid[r1][c1]
-            return False
-
-        return True
-
-    def valid_indices(self, r, c):
-        # Checks if the given row and column are within the board's bounds.
-        return 0 <= r < self.rows and 0 <= c < self.cols
-
-    def _check_local_matches(self, r, c):
-        # Efficiently checks for a match only around a specific candy's location.
-        candy_type = self.grid[r][c].image_index
-
-        h_count = 1
-        for i in range(1, 3):
-            if self.valid_indices(r, c - i) and self.grid[r][c - i].image_index == candy_type:
-                h_count += 1
-            else:
-                break
-        for i in range(1, 3):
-            if self.valid_indices(r, c + i) and self.grid[r][c + i].image_index == candy_type:
-                h_count += 1
-            else:
-                break
-        if h_count >= 3: return True
-
-        v_count = 1
-        for i in range(1, 3):
-            if self.valid_indices(r - i, c) and self.grid[r - i][c].image_index == candy_type:
-                v_count += 1
-            else:
-                break
-        for i in range(1, 3):
-            if self.valid_indices(r + i, c) and self.grid[r + i][c].image_index == candy_type:
-                v_count += 1
-            else:
-                break
-        if v_count >= 3: return True
-        return False
-
-    def check_matches(self):
-        # Scans the entire board for all horizontal and vertical matches.
-        matches = set()
-        for r in range(self.rows):
-            start_c = 0
-            for c in range(1, self.cols + 1):
-                if c == self.cols or self.grid[r][c].image_index != self.grid[r][start_c].image_index:
-                    if c - start_c >= 3:
-                        matches.update([(r, i) for i in range(start_c, c)])
-                    start_c = c
-
-        for c in range(self.cols):
-            start_r = 0
-            for r in range(1, self.rows + 1):
-                if r == self.rows or self.grid[r][c].image_index != self.grid[start_r][c].image_index:
-                    if r - start_r >= 3:
-                        matches.update([(i, c) for i in range(start_r, r)])
-                    start_r = r
-
-        self.matches = matches
-        return len(matches) > 0
-
-    def get_match_positions(self):
-        # Finds and returns the positions of all matched candies.
-        self.check_matches()
-        return list(self.matches)
-
-    def remove_matches(self):
-        # Removes all matched candies and refills the board with new ones from the top.
-        total_removed = 0
-        while self.check_matches():
-            for r, c in self.matches:
-                self.grid[r][c] = None
-            total_removed += len(self.matches)
-
-            for c in range(self.cols):
-                stack = []
-                for r in range(self.rows):
-                    if self.grid[r][c] is not None:
-                        stack.append(self.grid[r][c])
-                for r in range(self.rows):
-                    if len(stack) > 0:
-                        self.grid[self.rows - 1 - r][c] = stack.pop()
-                    else:
-                        self.grid[self.rows - 1 - r][c] = Candy(random.randint(0, self.num_types - 1), self.image_list)
-        return total_removed
-
-    def refill(self):
-        # Updates the board model after a match and returns data for falling animations.
-        if not self.matches:
-            return {}
-
-        fall_info = [[(None, r) for c in range(self.cols)] for r in range(self.rows)]
-
-        for r, c in self.matches:
-            self.grid[r][c] = None
-
-        for c in range(self.cols):
-            empty_count = 0
-            for r in range(self.rows - 1, -1, -1):
-                if self.grid[r][c] is None:
-                    empty_count += 1
-                elif empty_count > 0:
-                    new_r = r + empty_count
-                    self.grid[new_r][c] = self.grid[r][c]
-                    self.grid[r][c] = None
-                    fall_info[new_r][c] = (r, new_r)
-
-            for r in range(empty_count):
-                self.grid[r][c] = Candy(random.randint(0, self.num_types - 1), self.image_list)
-                fall_info[r][c] = (None, r) # New candy
-
-        return fall_info
-
-LEVELS = [
-    {"score_goal": 550, "moves": 15, "board_size": (5, 5), "num_types": 4, "difficulty": "Easy"},
-    {"score_goal": 700, "moves": 13, "board_size": (5, 5), "num_types": 5, "difficulty": "Easy"},
-    {"score_goal": 800, "moves": 15, "board_size": (6, 6), "num_types": 5, "difficulty": "Medium"},
-    {"score_goal": 900, "moves": 20, "board_size": (6, 6), "num_types": 6, "difficulty": "Medium"},
-    {"score_goal": 1000, "moves": 20, "board_size": (7, 7), "num_types": 6, "difficulty": "Hard"},
-    {"score_goal": 1100, "moves": 20, "board_size": (7, 7), "num_types": 7, "difficulty": "Hard"},
-    {"score_goal": 1200, "moves": 20, "board_size": (8, 8), "num_types": 7, "difficulty": "Very Hard"},
-    {"score_goal": 1300, "moves": 20, "board_size": (8, 8), "num_types": 8, "difficulty": "Very Hard"},
-    {"score_goal": 1400, "moves": 20, "board_size": (8, 8), "num_types": 8, "difficulty": "Expert"},
-    {"score_goal": 1500, "moves": 20, "board_size": (8, 8), "num_types": 9, "difficulty": "Expert"}
-]
+from animation import Animator, blend, ease_in, lerp
+from assets import BACKGROUND_SIZE, load_background, load_image
+from board import ENGINES, LEVELS, Fell, Game, Matched, Scored, Settled, board_class
+from metrics import METRICS
+from renderer import BoardCanvas
+import replay
+import snapshot
+from solver import Solver
+from worker import BoardWorker
+
+TITLE = "\U0001f36c Candy Crush \U0001f36d"
+TURBO_FPS = 30 # Most redraws per second while turbo autoplay runs; also the length of one engine slice
 
 class CandyCrushGUI:
     # Initializes the main game window, layout, and starts the first level.
-    def __init__(self, root: tk.Tk):
+    def __init__(self, root: tk.Tk, engine="list", metrics_path=None):
         self.root = root
+        self.board_class = board_class(engine)
         self.level = 0
-        self.score = 0
+        self.game = None # Score, moves and board of the current level attempt
         self.selected = None
         self.is_auto_playing = False
         self.is_animating = False
         self.failed_attempts = 0
-        self.score_goal = 0
-        self.moves_left = 0
         self.root.title("Candy Crush")
         self.idle_timer_id = None
+        self.cascade = None # Events of the turn being played back
+        self.cascade_steps = 0
+        self.created_cells = set() # Specials left by the last match, redrawn once the board has fallen
+        self.turbo = tk.BooleanVar(root, value=False)
+        self.turbo_job = None
+        self.solver = Solver(engine, time_budget=0.5)
+        self.worker = BoardWorker(root)
+        self.history = snapshot.UndoHistory()
+        self.recording = None # Replay of the current level attempt; None once it can no longer be replayed
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.metrics_path = metrics_path
+        if metrics_path:
+            METRICS.enable()
 
         self.root.geometry("800x700")
         self.root.resizable(True, True)
 
-        try:
-            img_path = os.path.join(ASSET_PATH, "background.png")
-            self.bg_img_pil = Image.open(img_path).resize((800, 700), Image.Resampling.LANCZOS)
-            self.bg_photo = ImageTk.PhotoImage(self.bg_img_pil)
-            self.bg_label = tk.Label(root, image=self.bg_photo)
-            self.bg_label.place(x=0, y=0, relwidth=1, relheight=1)
-        except Exception as e:
-            print(f"Could not load main background image: {e}")
-            root.config(bg="#fde0e0")
+        # The background image is decoded after the first level is on screen; until then
+        # (or for good, if it cannot be loaded) the window shows a plain colour.
+        self.bg_size = BACKGROUND_SIZE
+        self.bg_photo = None
+        self.resize_job = None
+        self.bg_label = tk.Label(root, bg="#fde0e0")
+        self.bg_label.place(x=0, y=0, relwidth=1, relheight=1)
 
-        self.header = tk.Label(root, text="\U0001f36c Candy Crush \U0001f36d", font=("Poppins", 26, "bold"), fg="#d12c8b")
+        self.header = tk.Label(root, text=TITLE, font=("Poppins", 26, "bold"), fg="#d12c8b")
         self.header.place(relx=0.5, rely=0.05, anchor="n")
 
         self.frame = tk.Frame(root, bg="#ffffff", bd=5, relief="groove")
         self.frame.place(relx=0.5, rely=0.5, anchor="center")
+        self.renderer = BoardCanvas(self.frame, self.select_candy)
+        self.animator = Animator(root)
 
         self.info_container = tk.Frame(self.root, bg=self.root.cget('bg'))
         self.info_container.pack(side=tk.BOTTOM, fill=tk.X, pady=10)
@@ -220,29 +67,81 @@ class CandyCrushGUI:
         self.info_frame.pack()
         self._create_info_widgets()
 
+        self.metrics_label = tk.Label(root, font=("Courier", 9), justify="left", anchor="nw", bg="#222222", fg="#7CFC00")
+        self.metrics_job = None
+        self.root.bind("<F3>", lambda e: self.toggle_metrics())
+        self.root.bind("<Control-z>", lambda e: self.undo())
+        self.root.bind("<Control-s>", lambda e: self.save_game())
+        self.root.bind("<Control-o>", lambda e: self.load_game())
+        self.root.bind("<Control-r>", lambda e: self.save_replay())
+
+        # Put the bare window on screen before building the board or decoding any images.
+        self.root.update()
+        self.window_shown = time.perf_counter() - STARTED
+        self.root.after_idle(self._finish_startup)
+
+    def _finish_startup(self):
+        # Builds the first level, reports how long it took to appear, then loads the background.
         self.init_level()
+        self.root.update_idletasks()
+        first_frame = time.perf_counter() - STARTED
+        METRICS.record("startup_window", self.window_shown)
+        METRICS.record("startup_frame", first_frame)
+        print(f"Startup: window shown in {self.window_shown * 1000:.0f} ms, first frame in {first_frame * 1000:.0f} ms")
+        self.root.after_idle(self._load_background)
+
+    def _load_background(self):
+        # Shows the background image and starts following window resizes with it.
+        try:
+            self.bg_photo = load_background(self.bg_size)
+        except Exception as e:
+            print(f"Could not load main background image: {e}")
+            return
+        self.bg_label.config(image=self.bg_photo)
+        self.root.bind("<Configure>", self._on_resize)
+
+    def _on_resize(self, event):
+        # Waits for the window to settle before swapping in a background for the new size.
+        if event.widget is not self.root:
+            return
+        if self.resize_job:
+            self.root.after_cancel(self.resize_job)
+        self.resize_job = self.root.after(150, self._resize_background)
+
+    def _resize_background(self):
+        # Sizes round up to 50px steps so dragging the window keeps hitting cached resolutions.
+        self.resize_job = None
+        step = 50
+        size = (-(-self.root.winfo_width() // step) * step, -(-self.root.winfo_height() // step) * step)
+        if size == self.bg_size:
+            return
+        try:
+            self.bg_photo = load_background(size)
+        except Exception as e:
+            print(f"Could not resize background image: {e}")
+            return
+        self.bg_size = size
+        self.bg_label.config(image=self.bg_photo)
 
     def init_level(self):
         # Sets up the game state and UI for the current level.
-        self.score = 0
         self.is_animating = False
         self.is_auto_playing = False
         self.selected = None
+        self.cascade = None
+        self._stop_turbo()
+        self.animator.cancel_all()
+        self.worker.cancel()
+        self.history.clear()
 
         config = LEVELS[self.level]
         self.rows, self.cols = config["board_size"]
         self.num_types = config["num_types"]
 
-        self.moves_left = config["moves"] + (self.failed_attempts * 5)
-        self.score_goal = config["score_goal"]
-
         self.candy_images = [load_image(i) for i in range(self.num_types)]
-        self.board = Board(self.rows, self.cols, self.num_types, self.candy_images)
-        self.buttons = [[None for _ in range(self.cols)] for _ in range(self.rows)]
-
-        for widget in self.frame.winfo_children():
-            widget.destroy()
-
+        self.game = Game(self.level, self.board_class, self.failed_attempts)
+        self.board = self.game.board
+        self.recording = replay.Replay(self.level, self.failed_attempts, self.game.seed)
         self.create_widgets()
 
         self.header.config(bg=self.bg_label.cget('bg'))
@@ -256,13 +155,13 @@ class CandyCrushGUI:
         stats_frame = tk.Frame(self.info_frame, bg="#f5c8ff")
         stats_frame.grid(row=0, column=0, columnspan=3)
 
-        self.score_label = tk.Label(self.info_frame, text=f"Score: {self.score}", font=("Arial", 14), bg="#f5c8ff", fg="black")
+        self.score_label = tk.Label(self.info_frame, text="Score: 0", font=("Arial", 14), bg="#f5c8ff", fg="black")
         self.score_label.grid(row=0, column=0, padx=10)
 
-        self.goal_label = tk.Label(self.info_frame, text=f"Goal: {self.score_goal}", font=("Arial", 14), bg="#f5c8ff", fg="black")
+        self.goal_label = tk.Label(self.info_frame, text="Goal: 0", font=("Arial", 14), bg="#f5c8ff", fg="black")
         self.goal_label.grid(row=0, column=1, padx=10)
 
-        self.moves_label = tk.Label(self.info_frame, text=f"Moves: {self.moves_left}", font=("Arial", 14), bg="#f5c8ff", fg="black")
+        self.moves_label = tk.Label(self.info_frame, text="Moves: 0", font=("Arial", 14), bg="#f5c8ff", fg="black")
         self.moves_label.grid(row=0, column=2, padx=10)
 
         self.level_label = tk.Label(self.info_frame, text=f"Level: {self.level + 1} ({LEVELS[self.level]['difficulty']})", font=("Arial", 14), bg="#f5c8ff", fg="black")
@@ -279,130 +178,156 @@ class CandyCrushGUI:
                              command=self.show_hint, bg="#fffbdd", fg="#777700", relief="raised", bd=2)
         hint_btn.grid(row=1, column=1, padx=10)
 
+        best_btn = tk.Button(self.info_frame, text="\U0001f9e0 Best Move", font=("Arial", 12, "bold"),
+                             command=self.show_best_move, bg="#ddeeff", fg="#003377", relief="raised", bd=2)
+        best_btn.grid(row=1, column=2, padx=10)
+
         self.autoplay_btn = tk.Button(self.info_frame, text="\U000025b6 Auto-Play", font=("Arial", 12, "bold"),
                                       command=self.toggle_autoplay, bg="#ddffdd", fg="#005500", relief="raised", bd=2)
-        self.autoplay_btn.grid(row=1, column=2, columnspan=2, padx=10)
+        self.autoplay_btn.grid(row=1, column=3, padx=10)
+
+        undo_btn = tk.Button(self.info_frame, text="\u21b6 Undo", font=("Arial", 12, "bold"),
+                             command=self.undo, bg="#eeeeee", fg="#333333", relief="raised", bd=2)
+        undo_btn.grid(row=2, column=0, padx=10, pady=5)
+
+        save_btn = tk.Button(self.info_frame, text="\U0001f4be Save", font=("Arial", 12, "bold"),
+                             command=self.save_game, bg="#eeeeee", fg="#333333", relief="raised", bd=2)
+        save_btn.grid(row=2, column=1, padx=10, pady=5)
+
+        load_btn = tk.Button(self.info_frame, text="\U0001f4c2 Load", font=("Arial", 12, "bold"),
+                             command=self.load_game, bg="#eeeeee", fg="#333333", relief="raised", bd=2)
+        load_btn.grid(row=2, column=2, padx=10, pady=5)
+
+        turbo_btn = tk.Checkbutton(self.info_frame, text="\u23e9 Turbo", font=("Arial", 12, "bold"), variable=self.turbo,
+                                   bg="#f5c8ff", activebackground="#f5c8ff")
+        turbo_btn.grid(row=2, column=3, padx=10, pady=5)
+
+        self.rate_label = tk.Label(self.info_frame, font=("Arial", 11), bg="#f5c8ff", fg="#555555")
 
     def create_widgets(self):
-        # Creates the grid of candy buttons for the current level.
-        for r in range(self.rows):
-            for c in range(self.cols):
-                btn = tk.Button(self.frame, width=60, height=60, image=None, borderwidth=2, bg="white",
-                                relief="raised", command=lambda r=r, c=c: self.select_candy(r, c))
-                btn.grid(row=r, column=c, padx=1, pady=1)
-                btn.bind("<Enter>", lambda e, b=btn: b.config(bg="#ffe6f0"))
-                btn.bind("<Leave>", lambda e, b=btn: b.config(bg="white"))
-                self.buttons[r][c] = btn
+        # Points the board canvas at the current level's size and candy images.
+        self.renderer.reset(self.rows, self.cols, self.candy_images)
 
     def update_gui(self):
-        # Refreshes the entire game grid and stat labels with the current game state.
-        for r in range(self.rows):
-            for c in range(self.cols):
-                candy = self.board.grid[r][c]
-                self.buttons[r][c].image = candy.image
-                self.buttons[r][c].config(image=candy.image, bg="white")
-        self.score_label.config(text=f"Score: {self.score}")
-        self.goal_label.config(text=f"Goal: {self.score_goal}")
-        self.moves_label.config(text=f"Moves: {self.moves_left}")
+        # Redraws the cells that changed since the last frame and refreshes the stat labels.
+        self.renderer.draw(self.board)
+        self.score_label.config(text=f"Score: {self.game.score}")
+        self.goal_label.config(text=f"Goal: {self.game.score_goal}")
+        self.moves_label.config(text=f"Moves: {self.game.moves_left}")
         self.level_label.config(text=f"Level: {self.level + 1} ({LEVELS[self.level]['difficulty']})")
 
     # Animates the visual swapping of two candies.
     def animate_swap(self, r1, c1, r2, c2, callback=None):
-        x1, y1 = self.buttons[r1][c1].winfo_x(), self.buttons[r1][c1].winfo_y()
-        x2, y2 = self.buttons[r2][c2].winfo_x(), self.buttons[r2][c2].winfo_y()
-        dx = (x2 - x1) / 10.0
-        dy = (y2 - y1) / 10.0
-
-        temp_label1 = tk.Label(self.frame, image=self.board.grid[r1][c1].image, bg="white")
-        temp_label2 = tk.Label(self.frame, image=self.board.grid[r2][c2].image, bg="white")
-        temp_label1.place(x=x1, y=y1)
-        temp_label2.place(x=x2, y=y2)
-
-        def move_step(step):
-            nonlocal x1, y1, x2, y2
-            x1 += dx
-            y1 += dy
-            x2 -= dx
-            y2 -= dy
-            temp_label1.place(x=x1, y=y1)
-            temp_label2.place(x=x2, y=y2)
-
-            if step < 10:
-                self.root.after(20, lambda s=step + 1: move_step(s))
-            else:
-                temp_label1.destroy()
-                temp_label2.destroy()
-                if callback:
-                    callback()
-        move_step(1)
-
-    # Animates a single candy falling to a new position.
-    def animate_fall(self, r, c, end_r, callback=None):
-        x, y = self.buttons[r][c].winfo_x(), self.buttons[r][c].winfo_y()
-        dy = (self.buttons[end_r][c].winfo_y() - y) / 10.0
-
-        def fall_step(step):
-            nonlocal y
-            y += dy
-            self.buttons[r][c].place(x=x, y=y)
-
-            if step < 10:
-                self.root.after(20, lambda s=step + 1: fall_step(s))
-            else:
-                if callback:
-                    callback()
-        fall_step(1)
-
-    def animate_and_remove_matches(self):
-        # Starts the animation sequence for matched candies.
-        if not self.board.check_matches():
+        renderer = self.renderer
+        x1, y1 = renderer.cell_center(r1, c1)
+        x2, y2 = renderer.cell_center(r2, c2)
+        renderer.lift(r1, c1)
+        renderer.lift(r2, c2)
+
+        def step(p):
+            renderer.move(r1, c1, lerp(x1, x2, p), lerp(y1, y2, p))
+            renderer.move(r2, c2, lerp(x2, x1, p), lerp(y2, y1, p))
+
+        def finish():
+            renderer.move(r1, c1, x1, y1)
+            renderer.move(r2, c2, x2, y2)
+            renderer.draw(self.board, ((r1, c1), (r2, c2)))
+            if callback:
+                callback()
+        self.animator.add(0.2, step, on_done=finish)
+
+    # Drops every moved and newly spawned candy of a FallPlan into place on one shared timeline.
+    # Spawned candies start above the board. Only the cells the plan filled and the specials the
+    # match left are redrawn; every cleared cell is one or the other.
+    def animate_fall(self, plan, callback=None):
+        renderer = self.renderer
+        renderer.draw(self.board, self.created_cells.union((r, c) for c, _, r in plan.moves()))
+        updates = []
+        for c, start_r, end_r in plan.moves():
+            x, y = renderer.cell_center(end_r, c)
+            y0 = renderer.cell_center(start_r, c)[1]
+            renderer.move(end_r, c, x, y0)
+            updates.append(lambda p, r=end_r, c=c, x=x, y0=y0, y=y: renderer.move(r, c, x, lerp(y0, y, p)))
+        self.animator.play(0.25, updates, easing=ease_in, on_done=callback)
+
+    # Fades the tiles of matched cells from a flash colour to the cleared colour.
+    def animate_match_fade(self, cells, callback=None):
+        tiles = [self.renderer.tiles[r][c] for r, c in cells]
+        canvas = self.renderer.canvas
+
+        def step(p):
+            color = blend("#ff9ccf", "#fff5f5", p)
+            for tile in tiles:
+                canvas.itemconfig(tile, fill=color)
+        self.animator.add(0.2, step, on_done=callback)
+
+    def play_turn(self, events):
+        # Plays back the events of a turn from Game.turn; the engine computes each cascade step as it is reached.
+        self.cascade = events
+        self.cascade_steps = 0
+        self._play_next_event()
+
+    def _play_next_event(self):
+        # Shows the next cascade event, then comes back here once its animation is over.
+        if self.cascade is None: # Dropped by a new level or restart
             return
+        event = next(self.cascade)
+        kind = type(event)
+        if kind is Settled:
+            self.cascade = None
+            self._finish_turn(event)
+        elif kind is Matched:
+            self.created_cells = set(event.created)
+            self.cascade_steps += 1
+            if self.cascade_steps > 1: # Let each cascade step register before the next one clears
+                cascade = self.cascade
+                self.root.after(300, lambda: cascade is self.cascade and self._fade_matched(event.cells))
+            else:
+                self._fade_matched(event.cells)
+        elif kind is Scored:
+            self.score_label.config(text=f"Score: {self.game.score}")
+            self._play_next_event()
+        elif kind is Fell:
+            self.animate_fall(event.plan, callback=self._play_next_event)
+        else:
+            self._play_next_event()
 
-        for r, c in self.board.matches:
-            self.buttons[r][c].config(image='', bg="#fff5f5")
-        self.root.after(200, self._refill_and_animate_fall)
-
-    def _refill_and_animate_fall(self):
-        # Refills the board model and triggers falling animations.
-        fall_info = self.board.refill()
-        removed = len(self.board.matches)
-        self.score += removed * 10
-
-        animated_candies = set()
-        for c in range(self.board.cols):
-            for r in range(self.board.rows -1, -1, -1):
-                if (r, c) not in animated_candies:
-                    start_r, end_r = fall_info[r][c]
-                    if start_r is not None:
-                        img = self.board.grid[end_r][c].image
-                        self.buttons[end_r][c].config(image=img)
-                        self.buttons[start_r][c].config(image='') # Hide original
-                        animated_candies.add((end_r, c))
-
-        self.update_gui()
-
-        self.root.after(250, self._check_game_state)
+    def _fade_matched(self, cells):
+        self.renderer.hide(cells)
+        self.animate_match_fade(cells, callback=self._play_next_event)
 
-    def _check_game_state(self):
-        # Checks for cascades, win/loss conditions, or continues auto-play after a turn.
-        if self.board.check_matches():
-            self.root.after(300, self.animate_and_remove_matches)
-        elif self.score >= self.score_goal:
+    def _finish_turn(self, settled):
+        # Acts on the end state the game reported for a turn: level won or lost, or the next move.
+        if settled.won:
             self.failed_attempts = 0
             messagebox.showinfo("Level Complete \U0001f389", f"You've completed Level {self.level + 1}!")
             self.next_level()
-        elif self.moves_left <= 0:
+        elif settled.over:
             self.failed_attempts += 1
-            if messagebox.askretrycancel("Game Over", f"You've run out of moves! Score: {self.score}/{self.score_goal}\n\nTry this level again?"):
+            if messagebox.askretrycancel("Game Over", f"You've run out of moves! Score: {settled.score}/{self.game.score_goal}\n\nTry this level again?"):
                 self.init_level()
             else:
-                self.root.quit()
-        elif self.is_auto_playing:
+                self.close()
+        elif settled.reshuffled:
+            # No move was left, so the game reshuffled the board; show it before the next move.
+            self.update_gui()
+            self.show_notice("No moves left - shuffled!")
+            self.root.after(600, self._next_move)
+        else:
+            self._next_move()
+
+    def _next_move(self):
+        if self.is_auto_playing:
             self.root.after(500, self.perform_auto_play)
         else:
             self.is_animating = False
             self.reset_idle_timer()
 
+    def show_notice(self, text, ms=1500):
+        # Shows a short message in place of the title for a moment.
+        self.header.config(text=text)
+        self.root.after(ms, lambda: self.header.config(text=TITLE))
+
     def select_candy(self, r, c):
             # Handles player clicks for selecting and swapping candies.
             if self.is_auto_playing or self.is_animating:
@@ -410,26 +335,26 @@ class CandyCrushGUI:
     
             if self.selected is None:
                 self.selected = (r, c)
-                self.buttons[r][c].config(relief="sunken", bg="#e0e0e0")
+                self.renderer.set_mark(r, c, "#e0e0e0")
             else:
                 r1, c1 = self.selected
     
                 if (r, c) == (r1, c1):
-                    self.buttons[r1][c1].config(relief="flat", bg="white")
+                    self.renderer.set_mark(r1, c1, None)
                     self.selected = None
                     return
     
                 self.reset_idle_timer()
 
-                if self.board.swap(r1, c1, r, c):
+                events = self._play_move(((r1, c1), (r, c)))
+                if events is not None:
                     self.is_animating = True
-                    self.moves_left -= 1
-                    self.moves_label.config(text=f"Moves: {self.moves_left}")
-                    self.animate_swap(r1, c1, r, c, callback=self.animate_and_remove_matches)
+                    self.moves_label.config(text=f"Moves: {self.game.moves_left}")
+                    self.animate_swap(r1, c1, r, c, callback=lambda: self.play_turn(events))
                 else:
                     self.root.bell()
     
-                self.buttons[r1][c1].config(relief="flat", bg="white")
+                self.renderer.set_mark(r1, c1, None)
                 self.selected = None
     
     def next_level(self):
@@ -437,16 +362,14 @@ class CandyCrushGUI:
             if self.level + 1 < len(LEVELS):
                 self.level += 1
                 self.failed_attempts = 0
-                self.score = 0
                 self.init_level()
             else:
                 messagebox.showinfo("Victory \U0001f389", "You've completed all levels!")
-                self.root.quit()
+                self.close()
     
     def restart_game(self):
             # Resets the game to Level 1.
             self.level = 0
-            self.score = 0
             self.failed_attempts = 0
             self.reset_idle_timer()
             self.init_level()
@@ -461,80 +384,249 @@ class CandyCrushGUI:
                 self.root.after_cancel(self.idle_timer_id)
             self.start_idle_timer()
     
-    def find_hint_fast(self):
-            # Finds the first available valid move on the board using a greedy search.
-            for r in range(self.rows):
-                for c in range(self.cols):
-                    if c + 1 < self.cols:
-                        self.board.grid[r][c], self.board.grid[r][c + 1] = self.board.grid[r][c + 1], self.board.grid[r][c]
-                        if self.board._check_local_matches(r, c) or self.board._check_local_matches(r, c + 1):
-                            self.board.grid[r][c], self.board.grid[r][c + 1] = self.board.grid[r][c + 1], self.board.grid[r][c] # Swap back
-                            return (r, c), (r, c + 1)
-                        self.board.grid[r][c], self.board.grid[r][c + 1] = self.board.grid[r][c + 1], self.board.grid[r][c] # Swap back
-                    if r + 1 < self.rows:
-                        self.board.grid[r][c], self.board.grid[r + 1][c] = self.board.grid[r + 1][c], self.board.grid[r][c]
-                        if self.board._check_local_matches(r, c) or self.board._check_local_matches(r + 1, c):
-                            self.board.grid[r][c], self.board.grid[r + 1][c] = self.board.grid[r + 1][c], self.board.grid[r][c] # Swap back
-                            return (r, c), (r + 1, c)
-                        self.board.grid[r][c], self.board.grid[r + 1][c] = self.board.grid[r + 1][c], self.board.grid[r][c] # Swap back
-            return None
-    
     def show_hint(self):
-            # Visually highlights a suggested move for the player.
-            if self.is_auto_playing: return
-            hint_move = self.find_hint_fast()
+            # Looks up a valid move in the background and highlights it when it arrives.
+            if self.is_auto_playing or self.is_animating: return
+            self.worker.submit(self.board, lambda board: board.first_move(), self._show_hint_result)
+    
+    def _show_hint_result(self, hint_move):
+            # Deadlocked boards are reshuffled at the end of the turn, so no move is only ever brief.
             if hint_move:
-                (r1, c1), (r2, c2) = hint_move
-                btn1, btn2 = self.buttons[r1][c1], self.buttons[r2][c2]
+                self._highlight_move(hint_move)
+            else:
+                self.root.bell()
     
-                btn1.unbind("<Enter>")
-                btn1.unbind("<Leave>")
-                btn2.unbind("<Enter>")
-                btn2.unbind("<Leave>")
+    def _highlight_move(self, move):
+            # Flashes the two cells of a move in yellow.
+            (r1, c1), (r2, c2) = move
+            self.renderer.set_mark(r1, c1, "yellow")
+            self.renderer.set_mark(r2, c2, "yellow")
     
-                btn1.config(bg="yellow")
-                btn2.config(bg="yellow")
+            def restore_hint_buttons():
+                self.renderer.set_mark(r1, c1, None)
+                self.renderer.set_mark(r2, c2, None)
     
-                def restore_hint_buttons():
-                    if btn1.winfo_exists():
-                        btn1.config(bg="white")
-                        btn1.bind("<Enter>", lambda e, b=btn1: b.config(bg="#ffe6f0"))
-                        btn1.bind("<Leave>", lambda e, b=btn1: b.config(bg="white"))
-                    if btn2.winfo_exists():
-                        btn2.config(bg="white")
-                        btn2.bind("<Enter>", lambda e, b=btn2: b.config(bg="#ffe6f0"))
-                        btn2.bind("<Leave>", lambda e, b=btn2: b.config(bg="white"))
+            self.root.after(700, restore_hint_buttons)
     
-                self.root.after(700, restore_hint_buttons)
-            else:
-                messagebox.showinfo("No Moves", "No possible moves found. Consider reshuffling the board.")
+    def find_best_move(self, callback):
+            # Runs the lookahead solver in the background and passes its move to callback on the
+            # Tk thread, unless the board has changed in the meantime.
+            score, score_goal, moves_left = self.game.score, self.game.score_goal, self.game.moves_left
+            self.worker.submit(self.board, lambda board: self.solver.best_move(board, score, score_goal, moves_left), callback)
+    
+    def show_best_move(self):
+            # Highlights the move the solver rates best for finishing the level.
+            if self.is_auto_playing or self.is_animating: return
+            self.reset_idle_timer()
+            self.find_best_move(self._show_hint_result)
     
     def toggle_autoplay(self):
             # Starts or stops the automatic playing mode.
             self.is_auto_playing = not self.is_auto_playing
             if self.is_auto_playing:
                 self.autoplay_btn.config(text="\U000023f8 Stop Auto", relief="sunken", bg="#ffaaaa")
-                self.perform_auto_play()
+                if not self.is_animating: # Otherwise _next_move starts it once the turn on screen has played out
+                    self.perform_auto_play()
             else:
                 self.autoplay_btn.config(text="\U000025b6 Auto-Play", relief="raised", bg="#ddffdd")
+                if self.turbo_job is not None:
+                    self._stop_turbo()
+                    self.is_animating = False
+                    self.update_gui()
+                    self.reset_idle_timer()
     
     def perform_auto_play(self):
-            # Executes a single move found by the hint system.
+            # Asks the solver for a move, or hands over to turbo mode; the Tk loop keeps running either way.
+            if not self.is_auto_playing: # Stopped while this move was pending
+                self.is_animating = False
+                self.reset_idle_timer()
+                return
+            self.is_animating = True
+            if self.turbo.get():
+                self._start_turbo()
+            else:
+                self.find_best_move(self._play_auto_move)
+    
+    def _start_turbo(self):
+            self._stop_turbo()
+            self.turbo_moves = 0
+            self.turbo_started = time.perf_counter()
+            self.rate_label.grid(row=3, column=0, columnspan=4)
+            self.turbo_job = self.root.after_idle(self._turbo_tick)
+    
+    def _stop_turbo(self):
+            if self.turbo_job is not None:
+                self.root.after_cancel(self.turbo_job)
+                self.turbo_job = None
+            self.rate_label.grid_remove()
+    
+    def _turbo_tick(self):
+            # Turbo autoplay: plays whole turns straight through the engine, with no animation, for
+            # one frame's worth of time, then redraws once and yields to Tk. Moves come from the
+            # hint search, since the solver's thinking time would be the limit otherwise.
+            self.turbo_job = None
             if not self.is_auto_playing:
                 return
+            if not self.turbo.get():
+                self._stop_turbo()
+                self.find_best_move(self._play_auto_move)
+                return
+            slice_end = time.perf_counter() + 1 / TURBO_FPS
+            while True:
+                move = self.board.first_move()
+                events = self._play_move(move)
+                if events is None:
+                    self.is_animating = False
+                    self._stop_turbo()
+                    self.toggle_autoplay()
+                    self.update_gui()
+                    return
+                for settled in events:
+                    pass # The game applies each event; the last one is Settled
+                self.turbo_moves += 1
+                if settled.over:
+                    self._stop_turbo()
+                    self.update_gui()
+                    self._finish_turn(settled)
+                    return
+                if time.perf_counter() >= slice_end:
+                    break
+            self.update_gui()
+            rate = self.turbo_moves / max(1e-9, time.perf_counter() - self.turbo_started)
+            self.rate_label.config(text=f"\u23e9 {rate:,.0f} moves/s")
+            self.turbo_job = self.root.after(1, self._turbo_tick)
     
-            hint_move = self.find_hint_fast()
-            if hint_move:
-                (r1, c1), (r2, c2) = hint_move
-                self.board.swap(r1, c1, r2, c2)
-                self.is_animating = True
-                self.moves_left -= 1
-                self.moves_label.config(text=f"Moves: {self.moves_left}")
-                self.animate_and_remove_matches()
-            else:
+    def _play_auto_move(self, move):
+            # Executes the solver's move, or stops auto-play when there is none.
+            if not self.is_auto_playing:
+                self.is_animating = False
+                self.reset_idle_timer()
+                return
+            events = self._play_move(move)
+            if events is None:
+                self.is_animating = False
                 self.toggle_autoplay()
+            else:
+                self.moves_label.config(text=f"Moves: {self.game.moves_left}")
+                self.play_turn(events)
+    
+    def take_snapshot(self):
+            return snapshot.take(self.board, self.level, self.game.score, self.game.moves_left, self.failed_attempts)
+    
+    def _play_move(self, move):
+            # Starts a turn in the game, keeping the position before it for undo and recording the
+            # swap for replay. Returns the turn's events from Game.turn, or None if there is no
+            # move or the swap is invalid.
+            if move is None:
+                return None
+            before = self.take_snapshot()
+            events = self.game.turn(*move[0], *move[1])
+            if events is None:
+                return None
+            self.history.push(before)
+            if self.recording:
+                self.recording.record(*move[0], *move[1])
+            return events
+    
+    def restore_snapshot(self, snap):
+            # Puts the game back to a saved moment, switching level first if the snapshot is from another one.
+            if snap.level != self.level or (snap.rows, snap.cols, snap.num_types) != (self.rows, self.cols, self.num_types):
+                self.level = snap.level
+                self.init_level()
+            self.worker.cancel()
+            self.board.restore(snap.cells)
+            self.game.score = snap.score
+            self.game.moves_left = snap.moves_left
+            self.failed_attempts = snap.failed_attempts
+            if self.selected:
+                self.renderer.set_mark(*self.selected, None)
+                self.selected = None
+            self.update_gui()
+            self.reset_idle_timer()
+    
+    def undo(self):
+            # Takes back the last move (Ctrl+Z).
+            if self.is_auto_playing or self.is_animating: return
+            snap = self.history.pop()
+            if snap is None:
+                self.root.bell()
+                return
+            self.restore_snapshot(snap)
+            if self.recording:
+                self.recording.record_undo()
+    
+    def save_game(self):
+            # Saves the current level, score and board (Ctrl+S).
+            if self.is_animating: return
+            try:
+                snapshot.save(self.take_snapshot())
+            except OSError as e:
+                messagebox.showerror("Save Failed", f"Could not save the game: {e}")
+    
+    def load_game(self):
+            # Restores the last saved game (Ctrl+O).
+            if self.is_auto_playing or self.is_animating: return
+            try:
+                snap = snapshot.load()
+            except FileNotFoundError:
+                messagebox.showinfo("No Saved Game", "There is no saved game yet.")
+                return
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Load Failed", f"Could not load the saved game: {e}")
+                return
+            self.restore_snapshot(snap)
+            self.history.clear() # Undo must not lead back into the game that was abandoned
+            self.recording = None # A loaded board has no seed to replay from
+    
+    def save_replay(self):
+            # Saves the seed and moves of this level attempt so far for replay.py (Ctrl+R).
+            if self.is_animating: return
+            if self.recording is None:
+                messagebox.showinfo("No Replay", "This game was loaded from a save, so it cannot be replayed.")
+                return
+            self.recording.finish(self.game.score, self.board)
+            try:
+                replay.save(self.recording)
+            except OSError as e:
+                messagebox.showerror("Save Failed", f"Could not save the replay: {e}")
+                return
+            self.show_notice("Replay saved")
+    
+    def toggle_metrics(self):
+            # Shows or hides the latency overlay (F3). Timing runs while it is shown or an export is pending.
+            if self.metrics_job is None:
+                METRICS.enable()
+                self.metrics_label.place(x=5, y=5)
+                self.metrics_label.lift()
+                self._refresh_metrics()
+            else:
+                self.root.after_cancel(self.metrics_job)
+                self.metrics_job = None
+                self.metrics_label.place_forget()
+                if not self.metrics_path:
+                    METRICS.disable()
+    
+    def _refresh_metrics(self):
+            self.metrics_label.config(text=METRICS.report())
+            self.metrics_job = self.root.after(500, self._refresh_metrics)
+    
+    def close(self):
+            # Stops the search workers before the window goes away and writes any requested metrics.
+            self.solver.shutdown()
+            self.worker.shutdown()
+            if self.metrics_path:
+                METRICS.export(self.metrics_path)
+            self.root.destroy()
+
+METRICS.instrument(CandyCrushGUI, update_gui="update_gui")
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Candy Crush")
+    parser.add_argument("--engine", default="list", choices=ENGINES, help="Board implementation behind hints and autoplay")
+    parser.add_argument("--metrics", metavar="PATH", help="collect per-phase latencies and write them here on exit (.json or text)")
+    args = parser.parse_args()
+
     root = tk.Tk()
-    game = CandyCrushGUI(root)
+    game = CandyCrushGUI(root, engine=args.engine, metrics_path=args.metrics)
     root.mainloop()
\ No newline at end of file
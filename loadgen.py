@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from board import ENGINES
+from metrics import Histogram
+from server import HOST, PORT
+
+class Client:
+    # One connection to the game server, sending a request and waiting for its reply.
+    def __init__(self, reader, writer, latency):
+        self.reader = reader
+        self.writer = writer
+        self.latency = latency
+        self.next_id = 0
+
+    @classmethod
+    async def connect(cls, host, port, latency):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer, latency)
+
+    async def request(self, op, **fields):
+        self.next_id += 1
+        start = time.perf_counter()
+        self.writer.write(json.dumps(dict(fields, op=op, id=self.next_id)).encode() + b"\n")
+        reply = json.loads(await self.reader.readline())
+        self.latency.record(time.perf_counter() - start)
+        if not reply["ok"]:
+            raise RuntimeError(f"{op} failed: {reply['error']}")
+        return reply
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+# Plays whole games on one connection until the deadline: new game, then hint and swap
+# until it is over or has no moves. Counts finished games and moves in `totals`.
+async def play_games(host, port, level, deadline, totals, latency):
+    client = await Client.connect(host, port, latency)
+    try:
+        while time.perf_counter() < deadline:
+            state = await client.request("new", level=level, cells=False)
+            session = state["session"]
+            while not state["over"] and time.perf_counter() < deadline:
+                move = (await client.request("hint", session=session))["move"]
+                if move is None:
+                    break
+                state = await client.request("swap", session=session, move=move, cells=False)
+                totals["moves"] += 1
+            await client.request("close", session=session)
+            totals["games"] += state["over"]
+    finally:
+        await client.close()
+
+async def run(host, port, clients, level, duration):
+    latency = Histogram()
+    totals = {"games": 0, "moves": 0}
+    start = time.perf_counter()
+    await asyncio.gather(*(play_games(host, port, level, start + duration, totals, latency) for _ in range(clients)))
+    return totals, latency, time.perf_counter() - start
+
+# Starts server.py in its own process so the client side doesn't compete with it for the GIL.
+def spawn_server(host, port, engine):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+    process = subprocess.Popen([sys.executable, script, "--host", host, "--port", str(port), "--engine", engine],
+                               stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("Server did not start")
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the game server with concurrent clients and report sessions and moves per second.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--clients", type=int, default=50, help="concurrent connections, one game at a time each")
+    parser.add_argument("--level", type=int, default=1, help="1-based level number to play")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--spawn", action="store_true", help="start a server for the run instead of using a running one")
+    parser.add_argument("--engine", default="list", choices=ENGINES, help="engine for the --spawn server")
+    args = parser.parse_args()
+
+    process = spawn_server(args.host, args.port, args.engine) if args.spawn else None
+    try:
+        totals, latency, elapsed = asyncio.run(run(args.host, args.port, args.clients, args.level - 1, args.duration))
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    s = latency.summary()
+    print(f"{args.clients} clients, level {args.level}, {elapsed:.1f}s")
+    print(f"games finished  {totals['games']:>8}  ({totals['games'] / elapsed:.1f}/s)")
+    print(f"moves           {totals['moves']:>8}  ({totals['moves'] / elapsed:.1f}/s)")
+    print(f"requests        {s['count']:>8}  ({s['count'] / elapsed:.1f}/s)")
+    print(f"latency ms      mean {s['mean_ms']:.2f}  p50 {s['p50_ms']:.2f}  p95 {s['p95_ms']:.2f}  p99 {s['p99_ms']:.2f}  max {s['max_ms']:.2f}")
+
+if __name__ == "__main__":
+    main()
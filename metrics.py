@@ -0,0 +1,139 @@
+import functools
+import json
+import time
+
+# Upper bounds of the latency buckets in milliseconds; anything slower lands in a final overflow bucket.
+BUCKETS_MS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 33, 66, 125, 250, 500, 1000)
+
+class Histogram:
+    # Latency distribution of one phase in fixed buckets, plus exact count, total and max.
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        ms = seconds * 1000
+        i = 0
+        while i < len(BUCKETS_MS) and ms > BUCKETS_MS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, p):
+        # Upper bound of the bucket holding the p-th percentile (the max for the overflow bucket).
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(BUCKETS_MS[i], self.max) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max,
+        }
+
+class Metrics:
+    # Per-phase latency histograms for the hot paths, plus frame times and dropped frames.
+    # Methods registered with instrument() are only wrapped while metrics are enabled, so
+    # with metrics off every call goes straight to the original method at no cost.
+    def __init__(self):
+        self.enabled = False
+        self.hooks = [] # (class, method name, phase)
+        self.originals = {}
+        self.reset()
+
+    def reset(self):
+        self.phases = {}
+        self.frame_times = Histogram()
+        self.dropped_frames = 0
+        self.started = time.time()
+
+    def instrument(self, cls, **phases):
+        # Times each named method of cls (method=phase) while metrics are enabled.
+        for name, phase in phases.items():
+            self.hooks.append((cls, name, phase))
+            if self.enabled:
+                self._wrap(cls, name, phase)
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        for cls, name, phase in self.hooks:
+            self._wrap(cls, name, phase)
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for (cls, name), original in self.originals.items():
+            setattr(cls, name, original)
+        self.originals.clear()
+
+    def _wrap(self, cls, name, phase):
+        original = cls.__dict__[name]
+        hist = self.phases.setdefault(phase, Histogram())
+        clock = time.perf_counter
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                hist.record(clock() - start)
+        self.originals[(cls, name)] = original
+        setattr(cls, name, timed)
+
+    def record(self, phase, seconds):
+        # Adds one measurement taken by the caller.
+        if phase not in self.phases:
+            self.phases[phase] = Histogram()
+        self.phases[phase].record(seconds)
+
+    def frame(self, interval, dropped):
+        # Records the time since the previous animation frame and how many frames it skipped.
+        self.frame_times.record(interval)
+        self.dropped_frames += dropped
+
+    def snapshot(self):
+        return {
+            "elapsed_s": time.time() - self.started,
+            "phases": {phase: hist.summary() for phase, hist in sorted(self.phases.items())},
+            "frame_time": self.frame_times.summary(),
+            "dropped_frames": self.dropped_frames,
+        }
+
+    def report(self):
+        # Formats the current numbers as a small fixed-width table.
+        lines = [f"{'phase':<14}{'count':>7}{'mean':>9}{'p95':>9}{'max':>9}  (ms)"]
+        rows = sorted(self.phases.items()) + [("frame time", self.frame_times)]
+        for phase, hist in rows:
+            s = hist.summary()
+            lines.append(f"{phase:<14}{s['count']:>7}{s['mean_ms']:>9.3f}{s['p95_ms']:>9.3f}{s['max_ms']:>9.3f}")
+        lines.append(f"dropped frames {self.dropped_frames}")
+        return "\n".join(lines)
+
+    def export(self, path):
+        # Writes the metrics to path, as JSON when it ends in .json and as the text report otherwise.
+        with open(path, "w") as f:
+            if path.endswith(".json"):
+                json.dump(self.snapshot(), f, indent=2)
+            else:
+                f.write(self.report() + "\n")
+
+METRICS = Metrics()
@@ -0,0 +1,139 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from board import COLOR_BOMB_CELL, COLORLESS, TYPE_MASK, Board, CellGrid, FallPlan
+from metrics import METRICS
+
+def _local_run(line, i):
+    # Counts the run through line[i], looking at most two cells to either side.
+    count = 1
+    for j in range(i - 1, max(i - 3, -1), -1):
+        if line[j] != line[i]:
+            break
+        count += 1
+    for j in range(i + 1, min(i + 3, len(line))):
+        if line[j] != line[i]:
+            break
+        count += 1
+    return count
+
+def _run_marks(a):
+    # Marks the cells of a 2-D array of colours that sit in a horizontal run of three or more.
+    # Empty cells (-1) and colour bombs both have COLORLESS colour bits and never match.
+    mark = np.zeros(a.shape, dtype=bool)
+    h = (a[:, :-2] == a[:, 1:-1]) & (a[:, 1:-1] == a[:, 2:]) & (a[:, :-2] != COLORLESS)
+    mark[:, :-2] |= h
+    mark[:, 1:-1] |= h
+    mark[:, 2:] |= h
+    return mark
+
+class NumpyBoard(Board):
+    # Board that stores packed cells in an int8 ndarray and finds runs with shifted-array comparisons.
+    def __init__(self, rows, cols, num_types, types=None, seed=None):
+        if np is None:
+            raise RuntimeError("NumpyBoard requires numpy to be installed")
+        super().__init__(rows, cols, num_types, types, seed)
+
+    def _fill(self, types):
+        if isinstance(types[0], bytes):
+            self.cells = np.frombuffer(b"".join(types), dtype=np.int8).reshape(self.rows, self.cols).copy()
+        else:
+            self.cells = np.array(types, dtype=np.int8).reshape(self.rows, self.cols)
+        self.grid = CellGrid(self)
+
+    def cell_types(self):
+        return self.cells.tolist()
+
+    def snapshot(self):
+        return self.cells.tobytes()
+
+    def type_at(self, r, c):
+        value = int(self.cells[r, c])
+        return -1 if value < 0 else value & TYPE_MASK
+
+    def cell_at(self, r, c):
+        return int(self.cells[r, c])
+
+    def set_cell(self, r, c, value):
+        self.cells[r, c] = value
+
+    def swap(self, r1, c1, r2, c2):
+        # Same rules as Board.swap, applied directly to the cell array.
+        if not self.valid_indices(r1, c1) or not self.valid_indices(r2, c2):
+            return False
+        if not ((abs(r1 - r2) == 1 and c1 == c2) or (abs(c1 - c2) == 1 and r1 == r2)):
+            return False
+
+        a = self.cells
+        a[r1, c1], a[r2, c2] = a[r2, c2], a[r1, c1]
+
+        if not (self._check_local_matches(r1, c1) or self._check_local_matches(r2, c2)):
+            a[r1, c1], a[r2, c2] = a[r2, c2], a[r1, c1]
+            return False
+
+        self._record_swap(r1, c1, r2, c2)
+        return True
+
+    def _is_valid_move(self, r1, c1, r2, c2):
+        a = self.cells
+        a[r1, c1], a[r2, c2] = a[r2, c2], a[r1, c1]
+        valid = self._check_local_matches(r1, c1) or self._check_local_matches(r2, c2)
+        a[r1, c1], a[r2, c2] = a[r2, c2], a[r1, c1]
+        return valid
+
+    def _check_local_matches(self, r, c):
+        # Checks the row and column slices around (r, c) for a run of three.
+        if self.cells[r, c] == COLOR_BOMB_CELL:
+            return True
+        lo = max(c - 2, 0)
+        if _local_run((self.cells[r, lo:c + 3] & TYPE_MASK).tolist(), c - lo) >= 3:
+            return True
+        lo = max(r - 2, 0)
+        return _local_run((self.cells[lo:r + 3, c] & TYPE_MASK).tolist(), r - lo) >= 3
+
+    def _scan_all(self):
+        # Marks every cell covered by a horizontal or vertical triple in one vectorized pass.
+        colors = self.cells & TYPE_MASK
+        mark = _run_marks(colors) | _run_marks(colors.T).T
+        rs, cs = np.nonzero(mark)
+        return set(zip(rs.tolist(), cs.tolist()))
+
+    def _scan_dirty(self):
+        # Runs the same vectorized scan over just the rows and columns holding a dirty cell.
+        if not self._dirty:
+            return set()
+        rows = np.fromiter({r for r, _ in self._dirty}, dtype=np.intp)
+        cols = np.fromiter({c for _, c in self._dirty}, dtype=np.intp)
+        ri, cs = np.nonzero(_run_marks(self.cells[rows] & TYPE_MASK))
+        ci, rs = np.nonzero(_run_marks(self.cells[:, cols].T & TYPE_MASK))
+        return set(zip(rows[ri].tolist(), cs.tolist())) | set(zip(rs.tolist(), cols[ci].tolist()))
+
+    def _cells_of_type(self, t):
+        rs, cs = np.nonzero((self.cells & TYPE_MASK) == t)
+        return set(zip(rs.tolist(), cs.tolist()))
+
+    def _collapse(self):
+        # Empties matched cells and drops the survivors of every touched column to the bottom
+        # with one stable argsort over the column block. The shifts come out as one array too.
+        cols = sorted(self._mark_columns_dirty())
+        rs, cs = zip(*self.matches)
+        self.cells[list(rs), list(cs)] = -1
+        block = self.cells[:, cols]
+        filled = block >= 0
+        order = np.argsort(filled, axis=0, kind="stable")
+        self.cells[:, cols] = np.take_along_axis(block, order, axis=0)
+
+        spawned = (~filled).sum(axis=0)
+        rows = np.arange(self.rows)[:, None]
+        shifts = np.where(rows < spawned, spawned, rows - order)
+        return FallPlan(cols, spawned.tolist(), shifts.T)
+
+    def _spawn(self, plan):
+        cells = self.cells
+        for c, count in zip(plan.cols, plan.spawned):
+            for r in range(count):
+                cells[r, c] = self.rng.randint(0, self.num_types - 1)
+
+METRICS.instrument(NumpyBoard, swap="swap")
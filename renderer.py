@@ -0,0 +1,128 @@
+import tkinter as tk
+
+from board import COLOR_BOMB, SPECIAL_SHIFT, STRIPED_H, STRIPED_V, TYPE_MASK, WRAPPED
+
+CELL = 64 # Pixel pitch of one cell, matching the old 60px buttons with their border and padding
+
+TILE_BG = "white"
+HOVER_BG = "#ffe6f0"
+
+# Glyph drawn over a special candy, by special kind.
+BADGES = {STRIPED_H: "\u2550", STRIPED_V: "\u2551", WRAPPED: "\u25a3", COLOR_BOMB: "\u2738"}
+
+class BoardCanvas:
+    # Draws the board on a single tk.Canvas with one background tile, one image item and one
+    # special-candy badge per cell. draw() only touches cells whose packed value changed since
+    # the last frame; callers that know which cells a step touched pass them so the rest of the
+    # board isn't compared. Clicks are mapped from canvas coordinates back to cells.
+    def __init__(self, parent, on_click):
+        self.canvas = tk.Canvas(parent, bg=TILE_BG, highlightthickness=0)
+        self.canvas.pack()
+        self.on_click = on_click
+        self.rows = self.cols = 0
+        self.tiles = []
+        self.items = []
+        self.badges = []
+        self.shown = []
+        self.marks = {}
+        self.hover = None
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<Motion>", self._on_motion)
+        self.canvas.bind("<Leave>", lambda e: self._set_hover(None))
+
+    def reset(self, rows, cols, images):
+        # Prepares the canvas for a new level, reusing the existing items when the size matches.
+        self.images = images
+        self.marks.clear()
+        self.hover = None
+        if (rows, cols) != (self.rows, self.cols):
+            self.canvas.delete("all")
+            self.rows, self.cols = rows, cols
+            self.canvas.config(width=cols * CELL, height=rows * CELL)
+            self.tiles = [[self.canvas.create_rectangle(c * CELL + 1, r * CELL + 1, (c + 1) * CELL - 1, (r + 1) * CELL - 1,
+                                                        fill=TILE_BG, outline="#e8e8e8") for c in range(cols)] for r in range(rows)]
+            self.items = [[self.canvas.create_image(*self.cell_center(r, c)) for c in range(cols)] for r in range(rows)]
+            self.badges = [[self.canvas.create_text(*self.cell_center(r, c), font=("Arial", 22, "bold"))
+                            for c in range(cols)] for r in range(rows)]
+        else:
+            # A cancelled swap or fall can leave candies between cells, so put every item back.
+            for r in range(rows):
+                for c in range(cols):
+                    self.canvas.itemconfig(self.tiles[r][c], fill=TILE_BG)
+                    self.move(r, c, *self.cell_center(r, c))
+        self.shown = [[None] * cols for _ in range(rows)]
+
+    def cell_center(self, r, c):
+        return c * CELL + CELL // 2, r * CELL + CELL // 2
+
+    def cell_at(self, x, y):
+        r, c = int(y // CELL), int(x // CELL)
+        if 0 <= r < self.rows and 0 <= c < self.cols:
+            return r, c
+        return None
+
+    def draw(self, board, cells=None):
+        # Brings every cell whose packed value differs from what is on screen up to date, looking
+        # only at `cells` when given. Returns the number of cells redrawn.
+        if cells is None:
+            cells = [(r, c) for r in range(self.rows) for c in range(self.cols)]
+        changed = 0
+        for r, c in cells:
+            v = board.cell_at(r, c)
+            if v != self.shown[r][c]:
+                t = v & TYPE_MASK
+                self.canvas.itemconfig(self.items[r][c], image=self.images[t] if 0 <= v and t < len(self.images) else "")
+                self.canvas.itemconfig(self.badges[r][c], text=BADGES.get(v >> SPECIAL_SHIFT, "") if v >= 0 else "")
+                self._paint(r, c)
+                self.shown[r][c] = v
+                changed += 1
+        return changed
+
+    def move(self, r, c, x, y):
+        # Moves the candy drawn for cell (r, c) to canvas point (x, y), badge included.
+        self.canvas.coords(self.items[r][c], x, y)
+        self.canvas.coords(self.badges[r][c], x, y)
+
+    def lift(self, r, c):
+        self.canvas.tag_raise(self.items[r][c])
+        self.canvas.tag_raise(self.badges[r][c])
+
+    def hide(self, cells, bg=None):
+        # Blanks the given cells until the next draw() finds their candy again.
+        for r, c in cells:
+            self.canvas.itemconfig(self.items[r][c], image="")
+            self.canvas.itemconfig(self.badges[r][c], text="")
+            self.shown[r][c] = -1
+            if bg:
+                self.canvas.itemconfig(self.tiles[r][c], fill=bg)
+
+    def set_mark(self, r, c, color):
+        # Highlights a cell (selection, hint); a color of None clears it.
+        if not (0 <= r < self.rows and 0 <= c < self.cols):
+            return # The level changed size under a pending callback
+        if color is None:
+            self.marks.pop((r, c), None)
+        else:
+            self.marks[(r, c)] = color
+        self._paint(r, c)
+
+    def _paint(self, r, c):
+        color = self.marks.get((r, c)) or (HOVER_BG if self.hover == (r, c) else TILE_BG)
+        self.canvas.itemconfig(self.tiles[r][c], fill=color)
+
+    def _set_hover(self, cell):
+        if cell == self.hover:
+            return
+        old, self.hover = self.hover, cell
+        if old:
+            self._paint(*old)
+        if cell:
+            self._paint(*cell)
+
+    def _on_motion(self, event):
+        self._set_hover(self.cell_at(event.x, event.y))
+
+    def _on_click(self, event):
+        cell = self.cell_at(event.x, event.y)
+        if cell:
+            self.on_click(*cell)
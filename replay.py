@@ -0,0 +1,141 @@
+import argparse
+import hashlib
+import os
+import struct
+import sys
+import time
+from collections import deque
+
+from board import ENGINES, LEVELS, Game, board_class
+from snapshot import UNDO_DEPTH
+
+# File layout: magic, format version, level, failed attempts, seed, action count, final score,
+# final board hash, then one ACTION per swap or undo. A swap is stored as its first cell and
+# the direction of the second (right or down), so every action packs into five bytes.
+MAGIC = b"CCRP"
+VERSION = 1
+HEADER = struct.Struct("<4sBHHQIiQ")
+ACTION = struct.Struct("<HHB")
+RIGHT, DOWN, UNDO = range(3)
+
+REPLAY_PATH = os.path.join(os.path.expanduser("~"), ".candy_crush.replay")
+
+# 64-bit digest of a board's layout, the same for every engine.
+def board_hash(board):
+    return int.from_bytes(hashlib.blake2b(board.snapshot(), digest_size=8).digest(), "little")
+
+class Replay:
+    # Everything needed to play a level attempt again: its seed and each swap or undo in order,
+    # plus the score and board hash it ended on, to check a re-run against.
+    def __init__(self, level, failed_attempts, seed, actions=None, score=0, board_hash=0):
+        self.level = level
+        self.failed_attempts = failed_attempts
+        self.seed = seed
+        self.actions = actions if actions is not None else [] # (r, c, RIGHT | DOWN | UNDO)
+        self.score = score
+        self.board_hash = board_hash
+
+    @classmethod
+    def from_game(cls, game):
+        replay = cls(game.level, game.failed_attempts, game.seed)
+        for move in game.log:
+            replay.record(*move)
+        replay.finish(game.score, game.board)
+        return replay
+
+    def record(self, r1, c1, r2, c2):
+        # Adds a valid swap of two adjacent cells.
+        if (r1, c1) > (r2, c2):
+            r1, c1, r2, c2 = r2, c2, r1, c1
+        self.actions.append((r1, c1, RIGHT if r1 == r2 else DOWN))
+
+    def record_undo(self):
+        self.actions.append((0, 0, UNDO))
+
+    def finish(self, score, board):
+        # Stores the outcome a re-run has to reproduce.
+        self.score = score
+        self.board_hash = board_hash(board)
+
+    def to_bytes(self):
+        header = HEADER.pack(MAGIC, VERSION, self.level, self.failed_attempts, self.seed, len(self.actions),
+                             self.score, self.board_hash)
+        return header + b"".join([ACTION.pack(*action) for action in self.actions])
+
+def from_bytes(data):
+    # Parses the output of Replay.to_bytes; raises ValueError for anything else.
+    if len(data) < HEADER.size:
+        raise ValueError("Replay data is truncated")
+    magic, version, level, failed_attempts, seed, count, score, digest = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a Candy Crush replay, or from an unsupported version")
+    if len(data) != HEADER.size + count * ACTION.size:
+        raise ValueError(f"Replay data should hold {count} actions")
+    if level >= len(LEVELS):
+        raise ValueError(f"Replay is from an unknown level {level + 1}")
+    actions = list(ACTION.iter_unpack(data[HEADER.size:]))
+    for i, (_, _, kind) in enumerate(actions):
+        if kind > UNDO:
+            raise ValueError(f"Action {i} has an unknown kind {kind}")
+    return Replay(level, failed_attempts, seed, actions, score, digest)
+
+def save(replay, path=REPLAY_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(replay.to_bytes())
+    os.replace(tmp, path)
+
+def load(path=REPLAY_PATH):
+    with open(path, "rb") as f:
+        return from_bytes(f.read())
+
+# Plays a replay again headlessly on any engine and returns the finished Game. Undo puts back
+# the layout, score and moves of the matching earlier turn but not the random state, just as
+# the game does. Raises ValueError if an action can no longer be played.
+def run(replay, engine="list"):
+    game = Game(replay.level, board_class(engine), replay.failed_attempts, seed=replay.seed)
+    history = deque(maxlen=UNDO_DEPTH)
+    for i, (r, c, kind) in enumerate(replay.actions):
+        if kind == UNDO:
+            if not history:
+                raise ValueError(f"Action {i}: nothing to undo")
+            cells, game.score, game.moves_left = history.pop()
+            game.board.restore(cells)
+            continue
+        history.append((game.board.snapshot(), game.score, game.moves_left))
+        r2, c2 = (r, c + 1) if kind == RIGHT else (r + 1, c)
+        if game.play(r, c, r2, c2) is None:
+            raise ValueError(f"Action {i}: swap ({r}, {c}) <-> ({r2}, {c2}) is not valid here")
+    return game
+
+# Re-runs one replay file and reports whether it reproduced the recorded outcome.
+def check(path, engine, repeat):
+    replay = load(path)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        game = run(replay, engine)
+    elapsed = (time.perf_counter() - start) / repeat
+    ok = game.score == replay.score and board_hash(game.board) == replay.board_hash
+    moves = sum(kind != UNDO for _, _, kind in replay.actions)
+    print(f"{'ok' if ok else 'MISMATCH':<9}{path}  level {replay.level + 1}, {moves} moves, score {game.score}"
+          f" (recorded {replay.score}), {elapsed * 1000:.1f} ms, {moves / max(elapsed, 1e-9):,.0f} moves/s")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run recorded games at full speed and check they end on the recorded score and board.")
+    parser.add_argument("paths", nargs="*", default=[REPLAY_PATH], help="replay files (default: the last one saved from the game)")
+    parser.add_argument("--engine", default="list", choices=ENGINES, help="Board implementation to replay on")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per replay, for steadier timings")
+    args = parser.parse_args()
+
+    results = []
+    for path in args.paths:
+        try:
+            results.append(check(path, args.engine, args.repeat))
+        except (OSError, ValueError) as e:
+            print(f"{'ERROR':<9}{path}  {e}")
+            results.append(False)
+    sys.exit(0 if all(results) else 1)
+
+if __name__ == "__main__":
+    main()
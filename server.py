@@ -0,0 +1,267 @@
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from board import ENGINES, LEVELS, Game, board_class
+from replay import Replay
+
+HOST = "127.0.0.1"
+PORT = 8765
+MAX_SESSIONS = 10000
+IDLE_TIMEOUT = 300 # Seconds a session may go without a request before it is evicted
+MAX_LINE = 1 << 16 # Longest request line accepted, in bytes
+
+# Protocol: one JSON object per line each way. Every request has an "op" and may carry an "id",
+# which is echoed back so clients can pipeline. Replies have "ok": true, or "ok": false and an "error".
+#   {"op": "new", "level": 0}                          -> session id and state
+#   {"op": "swap", "session": 1, "move": [[r1, c1], [r2, c2]]} -> "valid", "points" and state
+#   {"op": "state", "session": 1}                      -> state
+#   {"op": "hint", "session": 1}                       -> "move" ([[r1, c1], [r2, c2]] or null)
+#   {"op": "replay", "session": 1}                     -> "replay": the game so far as replay.py bytes, in hex
+#   {"op": "close", "session": 1}                      -> ends the session
+#   {"op": "stats"}                                    -> server counters
+# State requests and replies to new/swap include the board's packed cells as rows unless the
+# request says "cells": false.
+
+class ProtocolError(Exception):
+    pass
+
+class Session:
+    # One game being played by a client. The lock keeps requests on the same game in order;
+    # different sessions run independently.
+    def __init__(self, session_id, game):
+        self.id = session_id
+        self.game = game
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+    def state(self, cells=True):
+        game = self.game
+        state = {
+            "session": self.id,
+            "level": game.level,
+            "score": game.score,
+            "score_goal": game.score_goal,
+            "moves_left": game.moves_left,
+            "won": game.won,
+            "over": game.is_over(),
+            "rows": game.board.rows,
+            "cols": game.board.cols,
+        }
+        if cells:
+            state["cells"] = game.board.cell_types()
+        return state
+
+class SessionPool:
+    # Live sessions in least-recently-used order, capped at max_sessions. Sessions left idle for
+    # idle_timeout seconds are evicted by sweep(); a full pool sweeps before refusing a new game.
+    def __init__(self, max_sessions=MAX_SESSIONS, idle_timeout=IDLE_TIMEOUT):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = OrderedDict()
+        self.ids = itertools.count(1)
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def add(self, game):
+        if len(self.sessions) >= self.max_sessions:
+            self.sweep()
+            if len(self.sessions) >= self.max_sessions:
+                raise ProtocolError("Server is full")
+        session = Session(next(self.ids), game)
+        self.sessions[session.id] = session
+        return session
+
+    def get(self, session_id):
+        if not _is_int(session_id):
+            raise ProtocolError("Session must be an integer id")
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise ProtocolError(f"Unknown session {session_id!r}")
+        session.last_used = time.monotonic()
+        self.sessions.move_to_end(session_id)
+        return session
+
+    def remove(self, session_id):
+        self.sessions.pop(session_id, None)
+
+    def sweep(self):
+        # Evicts every idle session that is not in the middle of a request. Returns how many went.
+        cutoff = time.monotonic() - self.idle_timeout
+        stale = []
+        for session in self.sessions.values():
+            if session.last_used > cutoff:
+                break # Least recently used first, so the rest are newer
+            if not session.lock.locked():
+                stale.append(session.id)
+        for session_id in stale:
+            del self.sessions[session_id]
+        self.evicted += len(stale)
+        return len(stale)
+
+class GameServer:
+    # Hosts many headless games over TCP. Engine work (building boards, resolving cascades,
+    # finding hints) runs on a thread pool so the event loop keeps serving other sessions
+    # while one board is busy; the engine is pure Python, so the threads share one core.
+    def __init__(self, engine="list", max_sessions=MAX_SESSIONS, idle_timeout=IDLE_TIMEOUT, workers=None):
+        self.board_class = board_class(engine)
+        self.pool = SessionPool(max_sessions, idle_timeout)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.started = time.monotonic()
+        self.counts = {"connections": 0, "requests": 0, "games": 0, "moves": 0, "errors": 0}
+
+    async def serve(self, host=HOST, port=PORT):
+        server = await asyncio.start_server(self.handle_client, host, port, limit=MAX_LINE)
+        sweeper = asyncio.create_task(self._sweep_forever())
+        print(f"Serving on {', '.join(str(s.getsockname()) for s in server.sockets)}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            sweeper.cancel()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(max(1.0, self.pool.idle_timeout / 4))
+            self.pool.sweep()
+
+    async def handle_client(self, reader, writer):
+        # Answers one connection's requests in order until it closes.
+        self.counts["connections"] += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(self._encode({"ok": False, "error": "Request line too long"}))
+                    break
+                if not line:
+                    break
+                writer.write(self._encode(await self.respond(line)))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, line):
+        # Turns one request line into its reply; bad requests get an error reply, not a dropped connection.
+        self.counts["requests"] += 1
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                raise ProtocolError("Request is not valid JSON")
+            if not isinstance(request, dict):
+                raise ProtocolError("Request must be a JSON object")
+            request_id = request.get("id")
+            handler = getattr(self, "op_" + str(request.get("op")), None)
+            if handler is None:
+                raise ProtocolError(f"Unknown op {request.get('op')!r}")
+            reply = await handler(request)
+            reply["ok"] = True
+        except ProtocolError as e:
+            self.counts["errors"] += 1
+            reply = {"ok": False, "error": str(e)}
+        if request_id is not None:
+            reply["id"] = request_id
+        return reply
+
+    def _encode(self, reply):
+        return json.dumps(reply, separators=(",", ":")).encode() + b"\n"
+
+    async def _run(self, session, fn, *args):
+        # Runs engine work for a session off the event loop, one request per session at a time.
+        async with session.lock:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def op_new(self, request):
+        level = request.get("level", 0)
+        if not _is_int(level) or not 0 <= level < len(LEVELS):
+            raise ProtocolError(f"Level must be an index from 0 to {len(LEVELS) - 1}")
+        game = await asyncio.get_running_loop().run_in_executor(self.executor, Game, level, self.board_class)
+        session = self.pool.add(game)
+        self.counts["games"] += 1
+        return session.state(request.get("cells", True))
+
+    async def op_swap(self, request):
+        session = self.pool.get(request.get("session"))
+        (r1, c1), (r2, c2) = _parse_move(request.get("move"))
+        cells = request.get("cells", True)
+
+        def play():
+            if session.game.is_over():
+                return None
+            return session.game.play(r1, c1, r2, c2), session.state(cells)
+        result = await self._run(session, play)
+        if result is None:
+            raise ProtocolError("Game is over")
+        points, state = result
+        if points is not None:
+            self.counts["moves"] += 1
+        state.update(valid=points is not None, points=points or 0)
+        return state
+
+    async def op_state(self, request):
+        session = self.pool.get(request.get("session"))
+        return await self._run(session, session.state, request.get("cells", True))
+
+    async def op_hint(self, request):
+        session = self.pool.get(request.get("session"))
+        move = await self._run(session, session.game.board.first_move)
+        return {"session": session.id, "move": [list(move[0]), list(move[1])] if move else None}
+
+    async def op_replay(self, request):
+        session = self.pool.get(request.get("session"))
+        data = await self._run(session, lambda: Replay.from_game(session.game).to_bytes())
+        return {"session": session.id, "replay": data.hex()}
+
+    async def op_close(self, request):
+        session = self.pool.get(request.get("session"))
+        self.pool.remove(session.id)
+        return {"session": session.id}
+
+    async def op_stats(self, request):
+        return dict(self.counts, sessions=len(self.pool), evicted=self.pool.evicted,
+                    uptime_s=time.monotonic() - self.started)
+
+# JSON true and false arrive as bools, which Python also counts as ints.
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+# Checks a move is [[r1, c1], [r2, c2]] of ints; the board itself rejects cells off the grid.
+def _parse_move(move):
+    try:
+        (r1, c1), (r2, c2) = move
+    except (TypeError, ValueError):
+        raise ProtocolError("Move must be [[r1, c1], [r2, c2]]")
+    if not all(_is_int(v) for v in (r1, c1, r2, c2)):
+        raise ProtocolError("Move coordinates must be integers")
+    return (r1, c1), (r2, c2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Host headless Candy Crush games over a line-delimited JSON protocol.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--engine", default="list", choices=ENGINES, help="Board implementation")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS, help="most games held at once")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT, help="seconds before an idle session is evicted")
+    parser.add_argument("--workers", type=int, help="engine threads (default: the executor's own default)")
+    args = parser.parse_args()
+
+    server = GameServer(args.engine, args.max_sessions, args.idle_timeout, args.workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from board import ENGINES, LEVELS, Game, board_class
+from solver import Solver
+
+# Plays one game of a level and returns (won, score, moves used). The "first" policy plays
+# any valid move; "solver" asks the lookahead solver, searching in this process for think_time.
+def play_game(level, seed, engine="list", verify=False, policy="first", think_time=0.05):
+    game = Game(level, board_class(engine), seed=seed)
+    game.board.verify_matches = verify
+    solver = Solver(engine, time_budget=think_time, workers=0) if policy == "solver" else None
+    while not game.is_over():
+        if solver:
+            move = solver.best_move(game.board, game.score, game.score_goal, game.moves_left)
+        else:
+            move = game.board.first_move()
+        if move is None:
+            break
+        (r1, c1), (r2, c2) = move
+        game.play(r1, c1, r2, c2)
+    return game.won, game.score, game.moves_used
+
+# Worker entry point: plays a batch of seeds so results travel back in one message.
+def _play_batch(level, seeds, engine, verify, policy, think_time):
+    return [play_game(level, seed, engine, verify, policy, think_time) for seed in seeds]
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+# Reduces the raw results of one level to win rate, score distribution and moves used.
+def summarize(level, results):
+    wins = [won for won, _, _ in results]
+    scores = [score for _, score, _ in results]
+    moves = [used for _, _, used in results]
+    config = LEVELS[level]
+    return {
+        "level": level + 1,
+        "difficulty": config["difficulty"],
+        "score_goal": config["score_goal"],
+        "moves": config["moves"],
+        "games": len(results),
+        "win_rate": sum(wins) / len(results),
+        "score": {
+            "mean": statistics.fmean(scores),
+            "min": min(scores),
+            "p10": _percentile(scores, 0.10),
+            "p50": _percentile(scores, 0.50),
+            "p90": _percentile(scores, 0.90),
+            "max": max(scores),
+        },
+        "moves_used": {
+            "mean": statistics.fmean(moves),
+            "p50": _percentile(moves, 0.50),
+            "max": max(moves),
+        },
+    }
+
+# Plays `games` games of every requested level across a process pool.
+def simulate(levels, games, seed=0, engine="list", workers=None, batch_size=50, verify=False,
+             policy="first", think_time=0.05):
+    pending = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for level in levels:
+            first = seed + level * 1_000_000
+            pending[level] = [pool.submit(_play_batch, level, range(s, min(s + batch_size, first + games)), engine, verify, policy, think_time)
+                              for s in range(first, first + games, batch_size)]
+        return [summarize(level, [r for f in futures for r in f.result()]) for level, futures in pending.items()]
+
+def print_report(summaries):
+    print(f"{'Level':<6}{'Difficulty':<12}{'Goal':>6}{'Win %':>8}{'Score p10/p50/p90':>22}{'Mean':>8}{'Moves':>7}")
+    for s in summaries:
+        sc = s["score"]
+        spread = f"{sc['p10']}/{sc['p50']}/{sc['p90']}"
+        print(f"{s['level']:<6}{s['difficulty']:<12}{s['score_goal']:>6}{s['win_rate'] * 100:>7.1f}%"
+              f"{spread:>22}{sc['mean']:>8.0f}{s['moves_used']['mean']:>5.1f}/{s['moves']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Play every level headlessly with the hint policy and report balance statistics.")
+    parser.add_argument("--games", type=int, default=1000, help="games per level")
+    parser.add_argument("--levels", type=int, nargs="+", help="1-based level numbers (default: all)")
+    parser.add_argument("--seed", type=int, default=0, help="base RNG seed")
+    parser.add_argument("--engine", default="list", choices=ENGINES, help="Board implementation")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--policy", default="first", choices=["first", "solver"], help="how moves are chosen")
+    parser.add_argument("--think-time", type=float, default=0.05, help="solver seconds per move with --policy solver")
+    parser.add_argument("--verify-matches", action="store_true", help="check every incremental match scan against a full rescan")
+    parser.add_argument("--json", metavar="PATH", help="also write the summaries as JSON")
+    args = parser.parse_args()
+
+    levels = [n - 1 for n in args.levels] if args.levels else range(len(LEVELS))
+    start = time.perf_counter()
+    summaries = simulate(levels, args.games, args.seed, args.engine, args.workers, verify=args.verify_matches,
+                         policy=args.policy, think_time=args.think_time)
+    elapsed = time.perf_counter() - start
+
+    print_report(summaries)
+    print(f"\n{args.games * len(summaries)} games in {elapsed:.1f}s")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summaries, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import os
+import struct
+from collections import deque
+
+from board import COLOR_BOMB_CELL, LEVELS, SPECIAL_SHIFT, WRAPPED
+
+# File layout: magic, format version, level, failed attempts, score, moves left, rows, cols,
+# candy types, then rows * cols bytes of packed cells (see Board.snapshot).
+MAGIC = b"CCSV"
+VERSION = 1
+HEADER = struct.Struct("<4sBHHiHHHH")
+
+SAVE_PATH = os.path.join(os.path.expanduser("~"), ".candy_crush.sav")
+UNDO_DEPTH = 32
+
+class Snapshot:
+    # One moment of a level: the game counters plus the board layout as packed bytes. Taking
+    # one costs a single pass over the cells and shares no objects with the live game.
+    __slots__ = ("level", "failed_attempts", "score", "moves_left", "rows", "cols", "num_types", "cells")
+
+    def __init__(self, level, failed_attempts, score, moves_left, rows, cols, num_types, cells):
+        self.level = level
+        self.failed_attempts = failed_attempts
+        self.score = score
+        self.moves_left = moves_left
+        self.rows = rows
+        self.cols = cols
+        self.num_types = num_types
+        self.cells = cells
+
+    def to_bytes(self):
+        return HEADER.pack(MAGIC, VERSION, self.level, self.failed_attempts, self.score, self.moves_left,
+                           self.rows, self.cols, self.num_types) + self.cells
+
+def take(board, level, score, moves_left, failed_attempts=0):
+    return Snapshot(level, failed_attempts, score, moves_left, board.rows, board.cols, board.num_types, board.snapshot())
+
+def from_bytes(data):
+    # Parses the output of Snapshot.to_bytes; raises ValueError for anything else, including a
+    # board that does not fit its level or holds candies the level cannot have.
+    if len(data) < HEADER.size:
+        raise ValueError("Save data is truncated")
+    magic, version, level, failed_attempts, score, moves_left, rows, cols, num_types = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a Candy Crush save, or from an unsupported version")
+    if level >= len(LEVELS):
+        raise ValueError(f"Save is from an unknown level {level + 1}")
+    config = LEVELS[level]
+    if (rows, cols) != tuple(config["board_size"]) or num_types != config["num_types"]:
+        raise ValueError(f"Save has a {rows}x{cols} board of {num_types} candy types, which does not match level {level + 1}")
+    cells = bytes(data[HEADER.size:])
+    if len(cells) != rows * cols:
+        raise ValueError(f"Save data holds {len(cells)} cells, expected {rows * cols}")
+    bad = set(cells) - _cell_values(num_types)
+    if bad:
+        raise ValueError(f"Save holds cell values {sorted(bad)} that no candy of this level has")
+    return Snapshot(level, failed_attempts, score, moves_left, rows, cols, num_types, cells)
+
+# Every packed value a board of num_types colours can hold: each colour plain, striped or
+# wrapped, and the colourless colour bomb.
+def _cell_values(num_types):
+    values = {t | special << SPECIAL_SHIFT for t in range(num_types) for special in range(WRAPPED + 1)}
+    values.add(COLOR_BOMB_CELL)
+    return values
+
+def save(snapshot, path=SAVE_PATH):
+    # Writes through a temporary file so a crash mid-save never leaves a half-written save behind.
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(snapshot.to_bytes())
+    os.replace(tmp, path)
+
+def load(path=SAVE_PATH):
+    with open(path, "rb") as f:
+        return from_bytes(f.read())
+
+class UndoHistory:
+    # Ring buffer of the snapshots taken before each move, newest last. Once it holds `depth`
+    # snapshots the oldest is dropped for every new one.
+    def __init__(self, depth=UNDO_DEPTH):
+        self.entries = deque(maxlen=depth)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def push(self, snapshot):
+        self.entries.append(snapshot)
+
+    def pop(self):
+        # Returns the most recent snapshot, or None when there is nothing to undo.
+        return self.entries.pop() if self.entries else None
+
+    def clear(self):
+        self.entries.clear()
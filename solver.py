@@ -0,0 +1,117 @@
+import os
+import random
+import time
+
+from board import POINTS_PER_CANDY, board_class
+
+WIN_VALUE = 100000 # Any win outranks any losing line; more moves left breaks ties between wins
+
+class _Timeout(Exception):
+    pass
+
+class Search:
+    # Depth-limited expectimax for one level. Max nodes pick a move; chance nodes average
+    # over `samples` random refills of the cascade that move causes. There is no transposition
+    # table: every refill spawns fresh random candies, so the same position almost never comes
+    # up twice in one search.
+    def __init__(self, score_goal, samples, branching, deadline, seed):
+        self.score_goal = score_goal
+        self.samples = samples
+        self.branching = branching
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.nodes = 0
+
+    def value(self, board, score, moves_left, depth):
+        if score >= self.score_goal:
+            return WIN_VALUE + moves_left
+        if moves_left <= 0 or depth <= 0:
+            return score
+        moves = sorted(board.valid_moves())
+        if not moves:
+            return score
+        if len(moves) > self.branching:
+            moves = self.rng.sample(moves, self.branching)
+        return max(self.chance(board, score, moves_left, move, depth) for move in moves)
+
+    def chance(self, board, score, moves_left, move, depth):
+        # Expected value of playing `move`, averaged over sampled refills.
+        (r1, c1), (r2, c2) = move
+        total = 0
+        for _ in range(self.samples):
+            if self.deadline is not None and time.time() > self.deadline:
+                raise _Timeout()
+            self.nodes += 1
+            child = board.copy()
+            child.rng.seed(self.rng.getrandbits(64))
+            child.swap(r1, c1, r2, c2)
+            points = child.remove_matches() * POINTS_PER_CANDY
+            total += self.value(child, score + points, moves_left - 1, depth - 1)
+        return total / self.samples
+
+# Scores one root move with iterative deepening for up to `seconds`, never past `deadline`
+# (wall-clock, so it means the same in every process). Depth 1 always completes. Runs in a
+# worker process, so the board travels as its snapshot bytes. Returns (move, value, deepest depth).
+def evaluate_move(engine, rows, cols, num_types, cells, move, score, score_goal, moves_left,
+                  samples, branching, max_depth, seconds, deadline, seed):
+    board = board_class(engine)(rows, cols, num_types, types=cells)
+    search = Search(score_goal, samples, branching, None, seed)
+    best = search.chance(board, score, moves_left, move, 1)
+    depth_done = 1
+    search.deadline = min(time.time() + seconds, deadline)
+    for depth in range(2, max_depth + 1):
+        try:
+            best = search.chance(board, score, moves_left, move, depth)
+        except _Timeout:
+            break
+        depth_done = depth
+    return move, best, depth_done
+
+class Solver:
+    # Picks the move with the best expected outcome for the rest of the level. Each valid move
+    # is scored in its own worker within a per-move time budget; workers=0 searches in-process.
+    def __init__(self, engine="list", time_budget=0.5, samples=3, branching=6, max_depth=4, workers=None):
+        self.engine = engine
+        self.time_budget = time_budget
+        self.samples = samples
+        self.branching = branching
+        self.max_depth = max_depth
+        self.workers = os.cpu_count() if workers is None else workers
+        self.pool = None
+
+    def best_move(self, board, score, score_goal, moves_left):
+        # Returns ((r1, c1), (r2, c2)), or None when the board has no valid move.
+        moves = sorted(board.valid_moves())
+        if len(moves) <= 1:
+            return moves[0] if moves else None
+
+        # Moves queue up behind the workers, so each gets an equal slice of the budget.
+        deadline = time.time() + self.time_budget
+        seconds = self.time_budget * max(1, self.workers) / len(moves)
+        cells = board.snapshot()
+        args = [(self.engine, board.rows, board.cols, board.num_types, cells, move, score, score_goal, moves_left,
+                 self.samples, self.branching, self.max_depth, seconds, deadline, i) for i, move in enumerate(moves)]
+
+        if self.workers == 0:
+            results = [evaluate_move(*a) for a in args]
+        else:
+            # Imported on first use: the process machinery is slow to load and startup doesn't need it.
+            from concurrent.futures import ProcessPoolExecutor, wait
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            futures = [self.pool.submit(evaluate_move, *a) for a in args]
+            done, pending = wait(futures, timeout=self.time_budget + 0.5)
+            for f in pending:
+                f.cancel()
+            results = [f.result() for f in done]
+
+        if not results:
+            return moves[0]
+        # Highest expected value wins; deeper searches and then board order break ties.
+        results.sort()
+        return max(results, key=lambda r: (r[1], r[2]))[0]
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
@@ -0,0 +1,71 @@
+import pytest
+
+from board import ENGINES, Game, board_class
+from replay import board_hash
+
+# Cross-engine checks: every engine has to play the same game from the same seed and moves.
+CASES = [(0, 11), (3, 7), (5, 3), (9, 1)] # (level, seed)
+TURNS = 12
+
+# Plays the moves on one engine; returns the game and the first_move() it offered each turn.
+def play(engine, level, seed, moves):
+    game = Game(level, board_class(engine), seed=seed)
+    offered = []
+    for move in moves:
+        offered.append(game.board.first_move())
+        assert game.play(*move) is not None, f"{engine}: swap {move} rejected"
+    return game, offered
+
+# The first valid move each turn on the list engine, as (r1, c1, r2, c2).
+def move_sequence(level, seed):
+    game = Game(level, seed=seed)
+    moves = []
+    while len(moves) < TURNS and not game.is_over():
+        (r1, c1), (r2, c2) = game.board.first_move()
+        moves.append((r1, c1, r2, c2))
+        game.play(r1, c1, r2, c2)
+    return moves
+
+# Every adjacent swap that a fresh copy of the board accepts.
+def brute_force_moves(board):
+    moves = set()
+    for r in range(board.rows):
+        for c in range(board.cols):
+            for r2, c2 in ((r, c + 1), (r + 1, c)):
+                if r2 < board.rows and c2 < board.cols and board.copy().swap(r, c, r2, c2):
+                    moves.add(((r, c), (r2, c2)))
+    return moves
+
+@pytest.mark.parametrize("level, seed", CASES)
+def test_engines_agree_on_score_and_board(level, seed):
+    moves = move_sequence(level, seed)
+    reference, offered = play("list", level, seed, moves)
+    for engine in ENGINES[1:]:
+        game, engine_offered = play(engine, level, seed, moves)
+        assert engine_offered == offered, engine
+        assert game.score == reference.score, engine
+        assert board_hash(game.board) == board_hash(reference.board), engine
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("level, seed", CASES)
+def test_valid_moves_match_brute_force(engine, level, seed):
+    game = Game(level, board_class(engine), seed=seed)
+    for move in move_sequence(level, seed):
+        assert game.board.valid_moves() == brute_force_moves(game.board)
+        game.play(*move)
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("level, seed", CASES)
+def test_incremental_match_scan_matches_full_scan(engine, level, seed):
+    board = Game(level, board_class(engine), seed=seed).board
+    for r1, c1, r2, c2 in move_sequence(level, seed):
+        assert board.swap(r1, c1, r2, c2)
+        while True:
+            found = board.check_matches()
+            matches, created = set(board.matches), dict(board.created)
+            assert board.check_matches(full=True) == found
+            assert (board.matches, board.created) == (matches, created)
+            if not found:
+                break
+            board.refill()
+        board.ensure_moves()
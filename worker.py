@@ -0,0 +1,49 @@
+POLL_MS = 30
+
+class BoardWorker:
+    # Runs engine searches (hints, solver moves) on a background thread so Tk callbacks never
+    # block on the game engine. Each job gets its own copy of the board, taken when it is
+    # submitted, and its result is handed to the callback on the Tk thread. Only the newest job
+    # counts: submitting another, cancel(), or any change to the board (swap, refill) since the
+    # copy was taken makes the old result stale, and stale results are dropped.
+    def __init__(self, root, poll_ms=POLL_MS):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.executor = None # Started by the first submit; the import is left out of startup
+        self.job = None
+        self.poll_id = None
+
+    def submit(self, board, fn, callback):
+        # Runs fn(snapshot) in the background and later calls callback(result) on the Tk thread.
+        self.cancel()
+        if self.executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.executor = ThreadPoolExecutor(max_workers=1)
+        snapshot = board.copy()
+        self.job = (self.executor.submit(fn, snapshot), board, board.version, callback)
+        self.poll_id = self.root.after(self.poll_ms, self._poll)
+
+    def cancel(self):
+        # Forgets the current job; a search that is already running finishes unobserved.
+        if self.job is not None:
+            self.job[0].cancel()
+            self.job = None
+        if self.poll_id is not None:
+            self.root.after_cancel(self.poll_id)
+            self.poll_id = None
+
+    def _poll(self):
+        self.poll_id = None
+        future, board, version, callback = self.job
+        if board.version != version:
+            self.cancel()
+        elif not future.done():
+            self.poll_id = self.root.after(self.poll_ms, self._poll)
+        else:
+            self.job = None
+            callback(future.result())
+
+    def shutdown(self):
+        self.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)